@@ -0,0 +1,98 @@
+# benchmarks/bench_msgpack.py
+"""
+Compare JSON and MessagePack payload size and encode/decode time for the
+responses tablets fetch most: an order with its items and the full tab list.
+
+    python benchmarks/bench_msgpack.py
+"""
+import json
+import os
+import sys
+import timeit
+import zlib
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from content_negotiation import packb, unpackb  # noqa: E402
+
+ITERATIONS = 2000
+
+
+def sample_order(items: int = 12) -> dict:
+    now = datetime.utcnow()
+    return {
+        "_id": ObjectId(),
+        "table": "12",
+        "customer_name": "Walk-in",
+        "phone_number": None,
+        "orders": [
+            {
+                "item_id": f"item-{i}",
+                "type": ["Starter", "Main Course", "Dessert", "Drinks"][i % 4],
+                "item": f"Dish number {i}",
+                "quantity": 1 + i % 3,
+                "cost": 120.0 + i * 15,
+                "instructions": "less spicy" if i % 3 == 0 else None,
+                "status": "pending",
+                "cook": None,
+                "addedby": "table12",
+                "date": now - timedelta(minutes=i),
+                "takeaway": False,
+            }
+            for i in range(items)
+        ],
+        "order_date_time": now,
+        "order_status": "ordered",
+        "dine_in_takeaway": "dine-in",
+        "bill_amount": 2450.0,
+        "payment_status": "unpaid",
+        "payment_mode": None,
+        "order_by": {"username": "table12", "role": "Table"},
+        "user_name": "table12",
+    }
+
+
+def sample_tabs(count: int = 40) -> list:
+    return [
+        {
+            "id": str(ObjectId()),
+            "name": f"Tab {i}",
+            "user": f"table{i}",
+            "table": i,
+            "waiter_request": i % 7 == 0,
+            "waiter_text": "water please" if i % 7 == 0 else "",
+            "support_request": False,
+            "support_text": "",
+            "user_type": "Table",
+        }
+        for i in range(count)
+    ]
+
+
+def json_encode(payload) -> bytes:
+    # What FastAPI does for a JSON response
+    return json.dumps(jsonable_encoder(payload, custom_encoder={ObjectId: str})).encode()
+
+
+def bench(name: str, payload):
+    json_body = json_encode(payload)
+    msgpack_body = packb(payload)
+    rows = [
+        ("json", json_body, lambda: json_encode(payload), lambda: json.loads(json_body)),
+        ("msgpack", msgpack_body, lambda: packb(payload), lambda: unpackb(msgpack_body)),
+    ]
+    print(f"\n{name}")
+    print(f"{'format':<10}{'bytes':>8}{'deflated':>10}{'encode us':>12}{'decode us':>12}")
+    for label, body, encode, decode in rows:
+        encode_us = timeit.timeit(encode, number=ITERATIONS) / ITERATIONS * 1e6
+        decode_us = timeit.timeit(decode, number=ITERATIONS) / ITERATIONS * 1e6
+        print(f"{label:<10}{len(body):>8}{len(zlib.compress(body)):>10}{encode_us:>12.1f}{decode_us:>12.1f}")
+
+
+if __name__ == "__main__":
+    bench("order with 12 items", sample_order())
+    bench("list_tabs with 40 tabs", sample_tabs())
@@ -0,0 +1,67 @@
+# check_read_routing.py
+"""
+Check that reporting reads go to a secondary and latency-critical reads to the
+primary. Run it against a local three-node replica set:
+
+    mkdir -p /tmp/rs/0 /tmp/rs/1 /tmp/rs/2
+    mongod --replSet rs0 --port 27017 --dbpath /tmp/rs/0 --fork --logpath /tmp/rs/0.log
+    mongod --replSet rs0 --port 27018 --dbpath /tmp/rs/1 --fork --logpath /tmp/rs/1.log
+    mongod --replSet rs0 --port 27019 --dbpath /tmp/rs/2 --fork --logpath /tmp/rs/2.log
+    mongosh --port 27017 --eval 'rs.initiate({_id: "rs0", members: [
+        {_id: 0, host: "localhost:27017"}, {_id: 1, host: "localhost:27018"}, {_id: 2, host: "localhost:27019"}]})'
+
+    MONGO_URL="mongodb://localhost:27017,localhost:27018,localhost:27019/?replicaSet=rs0" python check_read_routing.py
+
+Stop a secondary or two to see reporting reads fall back to the primary.
+"""
+import sys
+
+from pymongo import monitoring
+
+
+class ServerRecorder(monitoring.CommandListener):
+    def __init__(self):
+        self.servers = []
+
+    def started(self, event):
+        if event.command_name == "find":
+            self.servers.append(event.connection_id)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+# Registered before the shared client is created, so it sees every command
+recorder = ServerRecorder()
+monitoring.register(recorder)
+
+from database import sync_client  # noqa: E402
+from routers.order import orders_collection  # noqa: E402
+
+
+def served_by(read) -> tuple:
+    recorder.servers.clear()
+    read()
+    return recorder.servers[-1]
+
+
+def main():
+    critical = served_by(lambda: orders_collection.find_one({}))
+    reporting = served_by(lambda: orders_collection.reporting.find_one({}))
+
+    primary = sync_client.primary
+    secondaries = sync_client.secondaries
+    print(f"primary: {primary}, secondaries: {sorted(secondaries)}")
+    print(f"latency-critical read served by {critical}")
+    print(f"reporting read served by {reporting}")
+
+    ok = critical == primary and (reporting in secondaries or (not secondaries and reporting == primary))
+    print("OK" if ok else "UNEXPECTED ROUTING")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
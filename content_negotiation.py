@@ -0,0 +1,149 @@
+# content_negotiation.py
+import asyncio
+import functools
+import json
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any
+
+import msgpack
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+from pydantic import BaseModel, parse_obj_as
+from starlette.requests import Request
+from starlette.responses import Response
+
+from profiling import ProfilingRoute
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+# MessagePack extension type carrying the 12 raw bytes of an ObjectId
+OBJECT_ID_EXT_TYPE = 1
+
+# Set while handling a request whose client accepts MessagePack
+_wants_msgpack: ContextVar[bool] = ContextVar("wants_msgpack", default=False)
+
+
+def _pack_default(value):
+    if isinstance(value, datetime):
+        # Stored datetimes are naive UTC
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return msgpack.Timestamp.from_datetime(value)
+    if isinstance(value, ObjectId):
+        return msgpack.ExtType(OBJECT_ID_EXT_TYPE, value.binary)
+    if isinstance(value, BaseModel):
+        return value.dict()
+    if isinstance(value, (set, tuple)):
+        return list(value)
+    return str(value)
+
+
+def _unpack_ext(code: int, data: bytes):
+    if code == OBJECT_ID_EXT_TYPE:
+        return ObjectId(data)
+    return msgpack.ExtType(code, data)
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def packb(value: Any) -> bytes:
+    return msgpack.packb(value, default=_pack_default, use_bin_type=True)
+
+
+def unpackb(data: bytes) -> Any:
+    return msgpack.unpackb(data, ext_hook=_unpack_ext, timestamp=3, raw=False)
+
+
+class MsgPackResponse(Response):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return packb(content)
+
+
+def _accepts_msgpack(request: Request) -> bool:
+    accept = request.headers.get("accept", "")
+    return any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES)
+
+
+def _is_msgpack_body(request: Request) -> bool:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    return content_type in MSGPACK_MEDIA_TYPES
+
+
+async def _as_json_request(request: Request) -> Request:
+    """
+    Re-issue a MessagePack request as JSON so FastAPI's body parsing and
+    validation apply unchanged. Bodies are small, the conversion is cheap.
+    """
+    try:
+        content = unpackb(await request.body())
+    except (ValueError, TypeError, InvalidId):
+        # Empty, truncated or malformed bodies, trailing bytes and bad ext payloads
+        raise HTTPException(status_code=400, detail="Invalid MessagePack body.")
+    body = json.dumps(content, default=_json_default).encode()
+    headers = [(key, value) for key, value in request.scope["headers"] if key not in (b"content-type", b"content-length")]
+    headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            return await request.receive()
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return Request({**request.scope, "headers": headers}, receive)
+
+
+def _negotiated_call(call, response_model, status_code: int):
+    def to_response(result):
+        if isinstance(result, Response) or not _wants_msgpack.get():
+            return result
+        # Keep FastAPI's response_model filtering, but skip jsonable_encoder
+        # so datetimes and ObjectIds are packed natively
+        if response_model is not None:
+            result = parse_obj_as(response_model, result)
+        return MsgPackResponse(result, status_code=status_code)
+
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def async_wrapper(*args, **kwargs):
+            return to_response(await call(*args, **kwargs))
+        return async_wrapper
+
+    @functools.wraps(call)
+    def wrapper(*args, **kwargs):
+        return to_response(call(*args, **kwargs))
+    return wrapper
+
+
+class NegotiatingRoute(ProfilingRoute):
+    """
+    Route class that accepts `application/msgpack` request bodies and answers
+    in MessagePack when the client's Accept header asks for it, JSON otherwise.
+    Datetimes use the MessagePack timestamp type, ObjectIds extension type 1.
+    """
+    def get_route_handler(self):
+        self.dependant.call = _negotiated_call(self.dependant.call, self.response_model, self.status_code or 200)
+        handler = super().get_route_handler()
+
+        async def negotiating_handler(request: Request):
+            if _is_msgpack_body(request):
+                request = await _as_json_request(request)
+            if not _accepts_msgpack(request):
+                return await handler(request)
+            token = _wants_msgpack.set(True)
+            try:
+                return await handler(request)
+            finally:
+                _wants_msgpack.reset(token)
+
+        return negotiating_handler
@@ -0,0 +1,257 @@
+# cook_scheduler.py
+import heapq
+import itertools
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from tenancy import TenantLocal
+
+logger = logging.getLogger(__name__)
+
+# Estimated prep time in minutes per dish type (starter/Main Course/Desert/Drinks)
+PREP_MINUTES = {
+    "starter": 10,
+    "main course": 20,
+    "dessert": 8,
+    "desert": 8,
+    "drinks": 3,
+}
+DEFAULT_PREP_MINUTES = 10
+
+# Item statuses still waiting on the kitchen
+PENDING_STATUSES = ("ordered", "pending")
+# Order statuses whose items no longer go to the kitchen. Cancelling an order
+# leaves its item statuses as they were.
+CLOSED_ORDER_STATUSES = ("completed", "cancelled")
+
+
+def _naive_utc(value: datetime) -> datetime:
+    # Mongo hands back naive UTC datetimes, request bodies may carry an offset
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def estimate_prep_minutes(item: dict) -> float:
+    """
+    Estimated time for one order line: the dish type's base time,
+    plus half of it again for every extra portion.
+    """
+    base = PREP_MINUTES.get(str(item.get("type", "")).lower(), DEFAULT_PREP_MINUTES)
+    quantity = max(int(item.get("quantity") or 1), 1)
+    return base * (1 + 0.5 * (quantity - 1))
+
+
+class Ticket:
+    """
+    One order line waiting on the kitchen. Lines are told apart by their
+    index in the order's items, since `item_id` names the dish and an order
+    can hold the same dish more than once.
+    """
+    def __init__(self, order_id: str, line: int, item: dict, table: Optional[str], ordered_at: datetime):
+        self.order_id = order_id
+        self.line = line
+        self.item_id = item["item_id"]
+        self.item = item.get("item")
+        self.type = item.get("type")
+        self.quantity = item.get("quantity")
+        self.instructions = item.get("instructions")
+        self.table = table
+        self.ordered_at = _naive_utc(ordered_at)
+        self.prep_minutes = estimate_prep_minutes(item)
+        self.cook: Optional[str] = None
+
+    @property
+    def key(self) -> Tuple[str, int]:
+        return self.order_id, self.line
+
+    def to_dict(self) -> dict:
+        return {
+            "order_id": self.order_id,
+            "line": self.line,
+            "item_id": self.item_id,
+            "item": self.item,
+            "type": self.type,
+            "quantity": self.quantity,
+            "instructions": self.instructions,
+            "table": self.table,
+            "ordered_at": self.ordered_at,
+            "prep_minutes": self.prep_minutes,
+            "cook": self.cook,
+        }
+
+
+class CookScheduler:
+    """
+    Assigns pending order items to on-shift cooks.
+
+    Each new ticket goes to the cook with the smallest estimated backlog, found
+    with a min-heap of (backlog, cook). Each cook works their queue oldest order
+    first, and tickets wait in an unassigned queue while nobody is on shift.
+    Heaps are updated lazily: outdated entries are skipped when they surface,
+    so adding, completing and reassigning a ticket are all O(log n).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._tickets: Dict[Tuple[str, int], Ticket] = {}
+        self._backlog: Dict[str, float] = {}
+        self._load_heap: List[tuple] = []
+        self._queues: Dict[str, List[tuple]] = {}
+        self._unassigned: List[tuple] = []
+
+    # Cooks
+
+    def start_shift(self, cook: str) -> List[Ticket]:
+        with self._lock:
+            if cook not in self._backlog:
+                self._backlog[cook] = 0.0
+                self._queues[cook] = []
+                self._push_load(cook)
+            # Waiting tickets go out oldest first
+            while self._unassigned:
+                ticket = self._pop_valid(self._unassigned, None)
+                if ticket is None:
+                    break
+                self._assign(ticket)
+            return self._queue_snapshot(cook)
+
+    def end_shift(self, cook: str):
+        with self._lock:
+            if cook not in self._backlog:
+                return
+            queue = self._queues.pop(cook)
+            del self._backlog[cook]
+            for *_, key in sorted(queue):
+                ticket = self._tickets.get(key)
+                if ticket is not None and ticket.cook == cook:
+                    ticket.cook = None
+                    self._assign(ticket)
+
+    def on_shift(self) -> List[str]:
+        with self._lock:
+            return sorted(self._backlog)
+
+    # Tickets
+
+    def add_item(self, order_id: str, line: int, item: dict, table: Optional[str], ordered_at: Optional[datetime]):
+        if item.get("status") not in PENDING_STATUSES or "item_id" not in item:
+            return
+        with self._lock:
+            ticket = Ticket(order_id, line, item, table, ordered_at or item.get("date") or datetime.utcnow())
+            if ticket.key in self._tickets:
+                return
+            self._tickets[ticket.key] = ticket
+            self._assign(ticket)
+
+    def add_order(self, order: dict):
+        order_id = str(order.get("order_id") or order.get("_id"))
+        for line, item in enumerate(order.get("orders", [])):
+            self.add_item(order_id, line, item, order.get("table"), order.get("order_date_time"))
+
+    def complete(self, order_id: str, line: int) -> Optional[Ticket]:
+        """
+        Drop a ticket that is no longer pending (cooked, served or cancelled).
+        """
+        with self._lock:
+            ticket = self._tickets.pop((order_id, line), None)
+            if ticket is not None and ticket.cook in self._backlog:
+                self._backlog[ticket.cook] -= ticket.prep_minutes
+                self._push_load(ticket.cook)
+            return ticket
+
+    def assigned_cook(self, order_id: str, line: int) -> Optional[str]:
+        """
+        The on-shift cook an order line is assigned to, None when it is unassigned or not queued.
+        """
+        with self._lock:
+            ticket = self._tickets.get((order_id, line))
+            return ticket.cook if ticket is not None else None
+
+    def next_ticket(self, cook: str) -> Optional[Ticket]:
+        with self._lock:
+            queue = self._queues.get(cook)
+            if queue is None:
+                return None
+            while queue:
+                *_, key = queue[0]
+                ticket = self._tickets.get(key)
+                if ticket is not None and ticket.cook == cook:
+                    return ticket
+                heapq.heappop(queue)
+            return None
+
+    def queue(self, cook: str) -> List[Ticket]:
+        with self._lock:
+            return self._queue_snapshot(cook)
+
+    def overview(self) -> dict:
+        with self._lock:
+            return {
+                "cooks": {
+                    cook: {"backlog_minutes": backlog, "tickets": len(self._queue_snapshot(cook))}
+                    for cook, backlog in sorted(self._backlog.items())
+                },
+                "unassigned": sum(1 for ticket in self._tickets.values() if ticket.cook is None),
+            }
+
+    # Internals, called with the lock held
+
+    def _push_load(self, cook: str):
+        heapq.heappush(self._load_heap, (self._backlog[cook], next(self._seq), cook))
+        # Outdated entries pile up as backlogs change, rebuild once they dominate
+        if len(self._load_heap) > 4 * len(self._backlog) + 16:
+            self._load_heap = [(backlog, next(self._seq), cook) for cook, backlog in self._backlog.items()]
+            heapq.heapify(self._load_heap)
+
+    def _least_loaded(self) -> Optional[str]:
+        while self._load_heap:
+            backlog, _, cook = self._load_heap[0]
+            if self._backlog.get(cook) == backlog:
+                return cook
+            heapq.heappop(self._load_heap)
+        return None
+
+    def _assign(self, ticket: Ticket):
+        entry = (ticket.ordered_at, next(self._seq), ticket.key)
+        cook = self._least_loaded()
+        if cook is None:
+            ticket.cook = None
+            heapq.heappush(self._unassigned, entry)
+            return
+        ticket.cook = cook
+        heapq.heappush(self._queues[cook], entry)
+        self._backlog[cook] += ticket.prep_minutes
+        self._push_load(cook)
+
+    def _pop_valid(self, heap: List[tuple], cook: Optional[str]) -> Optional[Ticket]:
+        while heap:
+            *_, key = heapq.heappop(heap)
+            ticket = self._tickets.get(key)
+            if ticket is not None and ticket.cook == cook:
+                return ticket
+        return None
+
+    def _queue_snapshot(self, cook: str) -> List[Ticket]:
+        tickets = [self._tickets.get(key) for *_, key in sorted(self._queues.get(cook, []))]
+        return [ticket for ticket in tickets if ticket is not None and ticket.cook == cook]
+
+
+# Each outlet has its own kitchen
+cook_scheduler = TenantLocal(lambda tenant: CookScheduler())
+
+
+def load_pending_tickets(orders_collection):
+    """
+    Seed the current tenant's scheduler with the items still pending in Mongo.
+    """
+    pending = orders_collection.find(
+        {"orders.status": {"$in": list(PENDING_STATUSES)}, "order_status": {"$nin": list(CLOSED_ORDER_STATUSES)}},
+        {"order_id": 1, "table": 1, "order_date_time": 1, "orders": 1},
+    )
+    count = 0
+    for order in pending:
+        cook_scheduler.add_order(order)
+        count += 1
+    logger.info(f"Cook scheduler loaded pending items from {count} orders")
@@ -0,0 +1,161 @@
+# dashboard.py
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, time
+from typing import Iterable, Optional
+
+from cook_scheduler import CLOSED_ORDER_STATUSES, PENDING_STATUSES
+from tenancy import TenantLocal
+
+logger = logging.getLogger(__name__)
+
+
+def _is_open(order: dict) -> bool:
+    return order.get("order_status") not in CLOSED_ORDER_STATUSES
+
+
+def _is_unpaid(order: dict) -> bool:
+    return order.get("payment_status") != "paid" and order.get("order_status") != "cancelled"
+
+
+def _pending_by_station(items: Iterable[dict]) -> Counter:
+    return Counter(item.get("type") or "unknown" for item in items if item.get("status") in PENDING_STATUSES)
+
+
+class DashboardCounters:
+    """
+    Live numbers for managers, kept in memory. Seeded once from Mongo, then
+    every write endpoint applies its own change in O(1) (O(items) when an
+    order's item list changes), so reads never touch the database.
+
+    Revenue is counted on the day an order is marked paid (UTC), recorded in
+    the order's `paid_at`. Callers apply a change only when their write
+    modified the document, so repeated requests are not counted twice.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open_orders = 0
+        self.unpaid_bills = 0
+        self.tables_occupied = 0
+        self.pending_by_station = Counter()
+        self._revenue_day = datetime.utcnow().date()
+        self._revenue = 0.0
+
+    def seed(self, orders_collection, tabs_collection):
+        """
+        Load the starting values with one aggregation over `orders` and a count over `tabs`.
+        """
+        today = datetime.combine(datetime.utcnow().date(), time.min)
+        result = next(orders_collection.aggregate([
+            {"$facet": {
+                "open": [
+                    {"$match": {"order_status": {"$nin": list(CLOSED_ORDER_STATUSES)}}},
+                    {"$count": "n"},
+                ],
+                "unpaid": [
+                    {"$match": {"payment_status": {"$ne": "paid"}, "order_status": {"$ne": "cancelled"}}},
+                    {"$count": "n"},
+                ],
+                "pending": [
+                    # Cancelling an order leaves its items 'ordered', skip closed orders
+                    {"$match": {
+                        "order_status": {"$nin": list(CLOSED_ORDER_STATUSES)},
+                        "orders.status": {"$in": list(PENDING_STATUSES)},
+                    }},
+                    {"$unwind": "$orders"},
+                    {"$match": {"orders.status": {"$in": list(PENDING_STATUSES)}}},
+                    {"$group": {"_id": "$orders.type", "n": {"$sum": 1}}},
+                ],
+                "revenue": [
+                    {"$match": {"payment_status": "paid", "paid_at": {"$gte": today}}},
+                    {"$group": {"_id": None, "total": {"$sum": "$bill_amount"}}},
+                ],
+            }},
+        ]), {})
+        tables_occupied = tabs_collection.count_documents({"table": {"$ne": None}})
+
+        with self._lock:
+            self.open_orders = result["open"][0]["n"] if result.get("open") else 0
+            self.unpaid_bills = result["unpaid"][0]["n"] if result.get("unpaid") else 0
+            self.pending_by_station = Counter({
+                row["_id"] or "unknown": row["n"] for row in result.get("pending", [])
+            })
+            self._revenue_day = today.date()
+            self._revenue = result["revenue"][0]["total"] if result.get("revenue") else 0.0
+            self.tables_occupied = tables_occupied
+
+    # Updates, one per write endpoint
+
+    def order_created(self, order: dict):
+        with self._lock:
+            self.open_orders += _is_open(order)
+            self.unpaid_bills += _is_unpaid(order)
+            self.pending_by_station.update(_pending_by_station(order.get("orders", [])))
+            if order.get("payment_status") == "paid":
+                self._add_revenue(order.get("bill_amount") or 0.0)
+
+    def order_cancelled(self, order: dict):
+        with self._lock:
+            self.open_orders -= _is_open(order)
+            self.unpaid_bills -= _is_unpaid(order)
+            self.pending_by_station.subtract(_pending_by_station(order.get("orders", [])))
+
+    def items_replaced(self, old_items: Iterable[dict], new_items: Iterable[dict]):
+        with self._lock:
+            self.pending_by_station.subtract(_pending_by_station(old_items))
+            self.pending_by_station.update(_pending_by_station(new_items))
+
+    def item_status_changed(self, item: dict, new_status: str):
+        with self._lock:
+            was_pending = item.get("status") in PENDING_STATUSES
+            is_pending = new_status in PENDING_STATUSES
+            if was_pending != is_pending:
+                self.pending_by_station[item.get("type") or "unknown"] += 1 if is_pending else -1
+
+    def payment_status_changed(self, order: dict, new_status: str):
+        with self._lock:
+            was_unpaid = _is_unpaid(order)
+            is_unpaid = _is_unpaid({**order, "payment_status": new_status})
+            self.unpaid_bills += is_unpaid - was_unpaid
+            was_paid = order.get("payment_status") == "paid"
+            if new_status == "paid" and not was_paid:
+                self._add_revenue(order.get("bill_amount") or 0.0)
+            elif was_paid and new_status != "paid":
+                self._add_revenue(-(order.get("bill_amount") or 0.0))
+
+    def table_changed(self, old_table: Optional[int], new_table: Optional[int]):
+        with self._lock:
+            self.tables_occupied += (new_table is not None) - (old_table is not None)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._roll_day()
+            return {
+                "open_orders": self.open_orders,
+                "tables_occupied": self.tables_occupied,
+                "pending_dishes": {station: n for station, n in self.pending_by_station.items() if n > 0},
+                "todays_revenue": round(self._revenue, 2),
+                "unpaid_bills": self.unpaid_bills,
+                "as_of": datetime.utcnow(),
+            }
+
+    # Internals, called with the lock held
+
+    def _roll_day(self):
+        today = datetime.utcnow().date()
+        if today != self._revenue_day:
+            self._revenue_day = today
+            self._revenue = 0.0
+
+    def _add_revenue(self, amount: float):
+        self._roll_day()
+        self._revenue += amount
+
+
+dashboard = TenantLocal(lambda tenant: DashboardCounters())
+
+
+def seed_dashboard(orders_collection, tabs_collection):
+    dashboard.seed(orders_collection, tabs_collection)
+    logger.info(f"Dashboard counters seeded: {dashboard.snapshot()}")
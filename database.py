@@ -1,9 +1,79 @@
+import os
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+from pymongo.read_preferences import Primary, SecondaryPreferred
+from profiling import mongo_listener
+from tenancy import DEFAULT_TENANT, current_tenant
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
 
 # MongoDB URI (replace with your MongoDB connection string)
-MONGO_URI = "mongodb://localhost:27017"  # Use your connection URI here
-DATABASE_NAME = "vamshi"  # Replace with your desired DB name
+MONGO_URI = os.getenv("MONGO_URL", "mongodb://localhost:27017")  # Use your connection URI here
+
+# One connection pool per process, shared by every tenant
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+# Database used by a non-default tenant, e.g. "jubilee_hotel_db"
+TENANT_DATABASE_TEMPLATE = os.getenv("TENANT_DATABASE_TEMPLATE", "{tenant}_{database}")
+
+# Read routing: latency-critical reads go to the primary, reporting reads to a
+# secondary no more than REPORTING_MAX_STALENESS_SECONDS behind (-1 for no bound,
+# otherwise at least 90), or to the primary when no such secondary is available
+LATENCY_CRITICAL = "latency_critical"
+REPORTING = "reporting"
+REPORTING_MAX_STALENESS_SECONDS = int(os.getenv("REPORTING_MAX_STALENESS_SECONDS", "90"))
+if REPORTING_MAX_STALENESS_SECONDS != -1 and REPORTING_MAX_STALENESS_SECONDS < 90:
+    raise ValueError("REPORTING_MAX_STALENESS_SECONDS must be -1 or at least 90")
+READ_PREFERENCES = {
+    LATENCY_CRITICAL: Primary(),
+    REPORTING: SecondaryPreferred(max_staleness=REPORTING_MAX_STALENESS_SECONDS),
+}
+
+# Create the MongoDB clients (pymongo for the routers, motor for async endpoints)
+sync_client = MongoClient(MONGO_URI, maxPoolSize=MONGO_MAX_POOL_SIZE, event_listeners=[mongo_listener])
+client = AsyncIOMotorClient(MONGO_URI, maxPoolSize=MONGO_MAX_POOL_SIZE)
+
+
+def tenant_database_name(database: str, tenant: str) -> str:
+    if tenant == DEFAULT_TENANT:
+        return database
+    return TENANT_DATABASE_TEMPLATE.format(tenant=tenant, database=database)
+
+
+class TenantCollection:
+    """
+    Stands in for a collection and routes every call to the current tenant's
+    database, so module-level collections keep working under multi-tenancy.
+    """
+    def __init__(self, mongo_client, database: str, name: str, read_mode: str = LATENCY_CRITICAL):
+        self._client = mongo_client
+        self._database = database
+        self._name = name
+        self._read_mode = read_mode
+
+    @property
+    def reporting(self) -> "TenantCollection":
+        """
+        The same collection for reporting reads (history listings, exports),
+        which may be served by a replica-set secondary.
+        """
+        return TenantCollection(self._client, self._database, self._name, REPORTING)
+
+    def for_tenant(self, tenant: str):
+        collection = self._client[tenant_database_name(self._database, tenant)][self._name]
+        if self._read_mode == LATENCY_CRITICAL:
+            return collection
+        return collection.with_options(read_preference=READ_PREFERENCES[self._read_mode])
+
+    def current(self):
+        return self.for_tenant(current_tenant())
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.current(), name)
+
 
-# Create a MongoDB client and connect to the database
-client = AsyncIOMotorClient(MONGO_URI)
-db = client[DATABASE_NAME]
+def tenant_collection(database: str, name: str, mongo_client=None) -> TenantCollection:
+    return TenantCollection(mongo_client or sync_client, database, name)
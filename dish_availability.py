@@ -0,0 +1,83 @@
+# dish_availability.py
+import logging
+import threading
+from typing import Dict, Iterable, List
+
+from order_events import OrderWaiters
+from tenancy import TenantLocal
+
+logger = logging.getLogger(__name__)
+
+# Key tabs wait on for menu changes
+MENU_KEY = "menu"
+
+
+class DishAvailability:
+    """
+    In-memory `available` flag of every dish in `dish_master`, keyed by dish id.
+    Loaded once, then kept current by the dish endpoints, so order writes can
+    be checked without a query. Every change bumps `version`.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._available: Dict[str, bool] = {}
+        self.version = 0
+
+    def load(self, dishes_collection):
+        available = {
+            dish["id"]: bool(dish.get("available"))
+            for dish in dishes_collection.find({"id": {"$ne": None}}, {"_id": 0, "id": 1, "available": 1})
+        }
+        with self._lock:
+            self._available = available
+            self.version += 1
+
+    def set(self, dish_id: str, available: bool) -> bool:
+        """
+        Record a dish's availability. Returns True when it changed.
+        """
+        with self._lock:
+            if self._available.get(dish_id) == available:
+                return False
+            self._available[dish_id] = available
+            self.version += 1
+            return True
+
+    def remove(self, dish_id: str) -> bool:
+        with self._lock:
+            if self._available.pop(dish_id, None) is None:
+                return False
+            self.version += 1
+            return True
+
+    def unavailable(self, item_ids: Iterable[str]) -> List[str]:
+        """
+        The ids among `item_ids` of dishes marked unavailable. Ids that are
+        not in the menu are not rejected.
+        """
+        available = self._available
+        return [item_id for item_id in item_ids if available.get(item_id) is False]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"version": self.version, "available": dict(self._available)}
+
+
+dish_availability = TenantLocal(lambda tenant: DishAvailability())
+menu_waiters = TenantLocal(lambda tenant: OrderWaiters())
+
+
+def dish_changed(dish_id: str, available: bool):
+    if dish_availability.set(dish_id, available):
+        menu_waiters.notify(MENU_KEY)
+
+
+def dish_removed(dish_id: str):
+    if dish_availability.remove(dish_id):
+        menu_waiters.notify(MENU_KEY)
+
+
+def load_dish_availability(dishes_collection):
+    dish_availability.load(dishes_collection)
+    menu_waiters.notify(MENU_KEY)
+    logger.info(f"Dish availability loaded, version {dish_availability.version}")
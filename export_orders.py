@@ -0,0 +1,40 @@
+# export_orders.py
+"""
+Export orders for accounting, one row per order item.
+
+    python export_orders.py 2024-06-01 2024-07-01 --out june.csv
+    python export_orders.py 2024-06-01 2024-07-01 --format parquet --out june.parquet
+
+Rows are streamed from the database, so memory use does not grow with the range.
+Parquet output needs pyarrow.
+"""
+import argparse
+import sys
+from datetime import datetime
+
+from order_export import csv_chunks, iter_order_rows, parquet_chunks
+from routers.order import orders_collection
+from tenancy import DEFAULT_TENANT, TENANTS, tenant_context
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export orders to CSV or Parquet.")
+    parser.add_argument("start", type=datetime.fromisoformat, help="first day (inclusive), e.g. 2024-06-01")
+    parser.add_argument("end", type=datetime.fromisoformat, help="last day (exclusive), e.g. 2024-07-01")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--out", required=True, help="output file")
+    parser.add_argument("--tenant", default=DEFAULT_TENANT, help="outlet to export")
+    args = parser.parse_args()
+    if args.tenant not in TENANTS:
+        parser.error(f"unknown tenant {args.tenant!r}, configured tenants: {', '.join(sorted(TENANTS))}")
+
+    with tenant_context(args.tenant), open(args.out, "wb") as f:
+        rows = iter_order_rows(orders_collection.reporting, args.start, args.end)
+        chunks = parquet_chunks(rows) if args.format == "parquet" else csv_chunks(rows)
+        for chunk in chunks:
+            f.write(chunk)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+# import_users.py
+"""
+Bulk import staff and tab accounts from a CSV or JSON file.
+
+    python import_users.py staff.csv
+    python import_users.py staff.json
+
+CSV files need a header row with name, username, password, privilege and
+optionally table. JSON files hold a list of objects with the same fields.
+"""
+import argparse
+import csv
+import json
+import sys
+
+from router import bulk_register_users
+from tenancy import DEFAULT_TENANT, TENANTS, tenant_context
+from utilities import shutdown_hash_pool
+
+
+def read_rows(path: str) -> list:
+    if path.lower().endswith(".json"):
+        with open(path) as f:
+            return json.load(f)
+    with open(path, newline="") as f:
+        # Empty CSV cells mean "not set", e.g. staff accounts without a table
+        return [
+            {key: value for key, value in row.items() if value not in ("", None)}
+            for row in csv.DictReader(f)
+        ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import users from CSV or JSON.")
+    parser.add_argument("path", help="CSV or JSON file with one user per row")
+    parser.add_argument("--tenant", default=DEFAULT_TENANT, help="outlet to import the users into")
+    args = parser.parse_args()
+    if args.tenant not in TENANTS:
+        parser.error(f"unknown tenant {args.tenant!r}, configured tenants: {', '.join(sorted(TENANTS))}")
+
+    try:
+        with tenant_context(args.tenant):
+            report = bulk_register_users(read_rows(args.path))
+    finally:
+        shutdown_hash_pool()
+
+    print(json.dumps(report, indent=2))
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,12 +5,23 @@ from typing import Optional
 from passlib.context import CryptContext
 import jwt
 import datetime
-import motor.motor_asyncio
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
-from router import user_router
+from starlette.concurrency import run_in_threadpool
+from router import user_router, user_bookkeeping
+from database import client as async_client, tenant_collection
+from tenancy import TENANTS, TenantMiddleware, tenant_context
+from utilities import shutdown_hash_pool
+from traffic import TRACE_CAPTURE_PATH, TraceCaptureMiddleware, TraceWriter
 from routers.order import order_router
 from routers.tab_router import tab_router
+from routers.cook_router import cook_router, orders_collection as kitchen_orders_collection, dishes_collection
+from dish_availability import load_dish_availability
+from cook_scheduler import load_pending_tickets
+from routers.dashboard_router import dashboard_router
+from routers.tab_router import tabs_collection
+from dashboard import seed_dashboard
+from routers.profile_router import profile_router
 import logging
 
 # Configure logging
@@ -25,10 +36,7 @@ load_dotenv()
 app = FastAPI()
 
 # MongoDB Connection
-MONGO_URL = "mongodb://localhost:27017"
-client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_URL)
-db = client["kitchen_db"]
-chef_collection = db["chefs"]
+chef_collection = tenant_collection("kitchen_db", "chefs", async_client)
 
 # Password Hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -47,6 +55,9 @@ origins = [
     "http://localhost:3000",
 ]
 
+# Resolve the outlet (tenant) of every request
+app.add_middleware(TenantMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,  # Allows requests from specified origins
@@ -55,6 +66,11 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# Request trace capture for replay (enabled by TRACE_CAPTURE_PATH)
+trace_writer = TraceWriter(TRACE_CAPTURE_PATH) if TRACE_CAPTURE_PATH else None
+if trace_writer:
+    app.add_middleware(TraceCaptureMiddleware, writer=trace_writer)
+
 # Pydantic Models
 class Chef(BaseModel):
     username: str
@@ -138,12 +154,34 @@ async def protected_route(token: str = Depends(oauth2_scheme)):
 app.include_router(user_router, prefix="/user", tags=["User Management"])
 app.include_router(order_router, prefix="/order", tags=["Order Management"])
 app.include_router(tab_router, prefix="/tabs", tags=["Tabs"])
+app.include_router(cook_router, prefix="/cook", tags=["Kitchen"])
+app.include_router(dashboard_router, prefix="/dashboard", tags=["Dashboard"])
+app.include_router(profile_router, prefix="/profiling", tags=["Profiling"])
 
 # Startup and Shutdown Events
 @app.on_event("startup")
 async def startup_event():
+    for tenant in sorted(TENANTS):
+        with tenant_context(tenant):
+            try:
+                await run_in_threadpool(load_pending_tickets, kitchen_orders_collection)
+            except Exception as e:
+                logger.warning(f"Could not load pending dishes of {tenant} into the cook scheduler: {e}")
+            try:
+                await run_in_threadpool(seed_dashboard, kitchen_orders_collection, tabs_collection)
+            except Exception as e:
+                logger.warning(f"Could not seed the dashboard counters of {tenant}: {e}")
+            try:
+                await run_in_threadpool(load_dish_availability, dishes_collection)
+            except Exception as e:
+                logger.warning(f"Could not load dish availability of {tenant}: {e}")
     logger.debug("Application startup complete.")
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    shutdown_hash_pool()
+    for bookkeeping in user_bookkeeping.all().values():
+        bookkeeping.close()
+    if trace_writer:
+        trace_writer.close()
     logger.debug("Application shutdown complete.")
\ No newline at end of file
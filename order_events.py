@@ -0,0 +1,74 @@
+# order_events.py
+import asyncio
+import os
+import threading
+from typing import Dict, Set, Tuple
+from tenancy import TenantLocal
+
+# Longest a long-poll request may wait
+LONG_POLL_MAX_SECONDS = float(os.getenv("LONG_POLL_MAX_SECONDS", "30"))
+# Wait used when a request sends no timeout, never above the cap
+LONG_POLL_DEFAULT_SECONDS = min(25.0, LONG_POLL_MAX_SECONDS)
+
+
+class OrderWaiters:
+    """
+    In-process registry of requests waiting for an order to change.
+
+    Write endpoints call `notify(order_id)` from their worker thread; waiters
+    are futures on the event loop, woken with `call_soon_threadsafe`. Waiting
+    holds no thread and makes no database calls. Only requests served by the
+    same process are woken.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters: Dict[str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Future]]] = {}
+
+    def register(self, order_id: str) -> Tuple[asyncio.AbstractEventLoop, asyncio.Future]:
+        """
+        Start listening before reading the order, so a write that lands
+        between the read and the wait is not missed.
+        """
+        loop = asyncio.get_running_loop()
+        waiter = (loop, loop.create_future())
+        with self._lock:
+            self._waiters.setdefault(order_id, set()).add(waiter)
+        return waiter
+
+    def unregister(self, order_id: str, waiter):
+        with self._lock:
+            waiters = self._waiters.get(order_id)
+            if waiters is not None:
+                waiters.discard(waiter)
+                if not waiters:
+                    del self._waiters[order_id]
+
+    async def wait(self, order_id: str, waiter, timeout: float) -> bool:
+        """
+        Wait for a notification on a registered waiter. Returns False on timeout.
+        """
+        try:
+            await asyncio.wait_for(waiter[1], timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.unregister(order_id, waiter)
+
+    def notify(self, order_id: str):
+        with self._lock:
+            waiters = self._waiters.pop(order_id, ())
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+    def waiting(self) -> int:
+        with self._lock:
+            return sum(len(waiters) for waiters in self._waiters.values())
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+order_waiters = TenantLocal(lambda tenant: OrderWaiters())
@@ -0,0 +1,185 @@
+# order_export.py
+import csv
+import io
+import logging
+import os
+from datetime import datetime
+from typing import Iterable, Iterator
+
+# Export Configuration
+EXPORT_CURSOR_BATCH_SIZE = int(os.getenv("EXPORT_CURSOR_BATCH_SIZE", "500"))
+EXPORT_CSV_CHUNK_ROWS = int(os.getenv("EXPORT_CSV_CHUNK_ROWS", "1000"))
+EXPORT_PARQUET_ROW_GROUP_SIZE = int(os.getenv("EXPORT_PARQUET_ROW_GROUP_SIZE", "10000"))
+
+# One row per order item, order fields repeated on every row
+ORDER_COLUMNS = [
+    "order_id", "table", "customer_name", "order_date_time", "order_status",
+    "dine_in_takeaway", "bill_amount", "payment_status", "payment_mode", "order_by",
+]
+ITEM_COLUMNS = [
+    "item_id", "type", "item", "quantity", "cost", "instructions",
+    "status", "cook", "addedby", "date", "takeaway",
+]
+COLUMNS = ORDER_COLUMNS + ITEM_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+
+def _to_int64(value) -> int:
+    value = int(value)
+    if not -2**63 <= value < 2**63:
+        raise OverflowError(f"out of int64 range: {value}")
+    return value
+
+
+def _to_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+        return value.strip().lower() == "true"
+    raise ValueError(f"not a boolean: {value!r}")
+
+
+def _to_datetime(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+def iter_order_rows(orders_collection, start: datetime, end: datetime) -> Iterator[dict]:
+    """
+    Stream orders placed in [start, end) from a cursor, flattened to one row per item.
+    Orders without items produce one row with empty item columns.
+    """
+    cursor = orders_collection.find(
+        {"order_date_time": {"$gte": start, "$lt": end}},
+        batch_size=EXPORT_CURSOR_BATCH_SIZE,
+    ).sort("order_date_time", 1)
+    try:
+        for order in cursor:
+            base = {
+                "order_id": str(order.get("order_id") or order["_id"]),
+                "table": order.get("table"),
+                "customer_name": order.get("customer_name"),
+                "order_date_time": order.get("order_date_time"),
+                "order_status": order.get("order_status"),
+                "dine_in_takeaway": order.get("dine_in_takeaway"),
+                "bill_amount": order.get("bill_amount"),
+                "payment_status": order.get("payment_status"),
+                "payment_mode": order.get("payment_mode"),
+                "order_by": (order.get("order_by") or {}).get("username"),
+            }
+            items = order.get("orders") or [{}]
+            for item in items:
+                yield {**base, **{column: item.get(column) for column in ITEM_COLUMNS}}
+    finally:
+        cursor.close()
+
+
+def csv_chunks(rows: Iterable[dict], chunk_rows: int = EXPORT_CSV_CHUNK_ROWS) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % chunk_rows == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file that hands out what has been written so far, so Parquet
+    output can be streamed one row group at a time.
+    """
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def parquet_chunks(rows: Iterable[dict], row_group_size: int = EXPORT_PARQUET_ROW_GROUP_SIZE) -> Iterator[bytes]:
+    """
+    Write rows as Parquet, one row group per `row_group_size` rows, yielding
+    the file's bytes as each row group is completed. Needs pyarrow.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("order_id", pa.string()), ("table", pa.string()), ("customer_name", pa.string()),
+        ("order_date_time", pa.timestamp("ms")), ("order_status", pa.string()),
+        ("dine_in_takeaway", pa.string()), ("bill_amount", pa.float64()),
+        ("payment_status", pa.string()), ("payment_mode", pa.string()), ("order_by", pa.string()),
+        ("item_id", pa.string()), ("type", pa.string()), ("item", pa.string()),
+        ("quantity", pa.int64()), ("cost", pa.float64()), ("instructions", pa.string()),
+        ("status", pa.string()), ("cook", pa.string()), ("addedby", pa.string()),
+        ("date", pa.timestamp("ms")), ("takeaway", pa.bool_()),
+    ])
+    string_columns = [field.name for field in schema if pa.types.is_string(field.type)]
+    # Items added through modify_order_items are stored unvalidated, so values
+    # may not fit their column. They are converted, or written as null.
+    converters = {}
+    for field in schema:
+        if pa.types.is_integer(field.type):
+            converters[field.name] = _to_int64
+        elif pa.types.is_floating(field.type):
+            converters[field.name] = float
+        elif pa.types.is_boolean(field.type):
+            converters[field.name] = _to_bool
+        elif pa.types.is_timestamp(field.type):
+            converters[field.name] = _to_datetime
+
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+
+    def write_group(batch):
+        for row in batch:
+            for column in string_columns:
+                if row[column] is not None:
+                    row[column] = str(row[column])
+            for column, convert in converters.items():
+                value = row[column]
+                if value is None:
+                    continue
+                try:
+                    row[column] = convert(value)
+                except (TypeError, ValueError, OverflowError):
+                    logger.warning(
+                        f"Export: {column}={value!r} of order {row['order_id']} item {row['item_id']} "
+                        f"does not fit the column, written as null"
+                    )
+                    row[column] = None
+        writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == row_group_size:
+            write_group(batch)
+            batch = []
+            yield sink.drain()
+    if batch:
+        write_group(batch)
+    writer.close()
+    yield sink.drain()
@@ -0,0 +1,196 @@
+# profiling.py
+import asyncio
+import cProfile
+import functools
+import io
+import itertools
+import logging
+import marshal
+import os
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+
+from fastapi.routing import APIRoute
+from pymongo import monitoring
+from starlette.concurrency import run_in_threadpool
+from dotenv import load_dotenv
+
+from tenancy import TenantLocal, current_tenant
+
+# Load environment variables
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Profiling Configuration
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "X-Profile")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_BUFFER_SIZE = int(os.getenv("PROFILE_BUFFER_SIZE", "50"))
+
+# The run being captured for the current request, None when not sampled
+_current_run: ContextVar[Optional["ProfileRun"]] = ContextVar("profile_run", default=None)
+
+# Ring buffer of recent profiles, kept per tenant
+_profiles = TenantLocal(lambda tenant: deque(maxlen=PROFILE_BUFFER_SIZE))
+_profiles_lock = threading.Lock()
+_profile_ids = itertools.count(1)
+
+
+class ProfileRun:
+    def __init__(self, route: str, method: str, path: str):
+        self.id = next(_profile_ids)
+        self.tenant = current_tenant()
+        self.route = route
+        self.method = method
+        self.path = path
+        self.started_at = datetime.utcnow()
+        self.wall_ms = 0.0
+        self.mongo_ms = 0.0
+        self.mongo_calls = 0
+        self.profiler: Optional[cProfile.Profile] = None
+
+    def add_mongo(self, duration_micros: int):
+        self.mongo_ms += duration_micros / 1000
+        self.mongo_calls += 1
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "tenant": self.tenant,
+            "route": self.route,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "wall_ms": round(self.wall_ms, 3),
+            "mongo_ms": round(self.mongo_ms, 3),
+            "mongo_calls": self.mongo_calls,
+            "python_ms": round(max(self.wall_ms - self.mongo_ms, 0.0), 3),
+        }
+
+    def stats_text(self, limit: int = 30) -> str:
+        if self.profiler is None:
+            return ""
+        stream = io.StringIO()
+        pstats.Stats(self.profiler, stream=stream).sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+    def dump(self) -> bytes:
+        """
+        Serialize the profile in the format written by `pstats.Stats.dump_stats`.
+        """
+        if self.profiler is None:
+            return b""
+        self.profiler.create_stats()
+        return marshal.dumps(self.profiler.stats)
+
+
+class MongoTimingListener(monitoring.CommandListener):
+    """
+    Attributes Mongo command time to the request being profiled, if any.
+    """
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        run = _current_run.get()
+        if run is not None:
+            run.add_mongo(event.duration_micros)
+
+    def failed(self, event):
+        run = _current_run.get()
+        if run is not None:
+            run.add_mongo(event.duration_micros)
+
+
+mongo_listener = MongoTimingListener()
+
+
+def list_profiles() -> list:
+    with _profiles_lock:
+        return [run.summary() for run in reversed(_profiles.current())]
+
+
+def get_profile(profile_id: int) -> Optional[ProfileRun]:
+    with _profiles_lock:
+        for run in _profiles.current():
+            if run.id == profile_id:
+                return run
+    return None
+
+
+def _store(run: ProfileRun):
+    with _profiles_lock:
+        _profiles.for_tenant(run.tenant).append(run)
+    logger.info(
+        f"Profiled {run.route}: wall={run.wall_ms:.1f}ms mongo={run.mongo_ms:.1f}ms "
+        f"({run.mongo_calls} calls)"
+    )
+
+
+def _is_admin_token(authorization: str) -> bool:
+    # Imported lazily, router.py builds its MongoClient with our listener
+    from jose import JWTError, jwt
+    from router import ALGORITHM, SECRET_KEY, users_collection
+
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        username = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return False
+    user = users_collection.find_one({"username": username}, {"privilege": 1})
+    return bool(user) and user.get("privilege") == "admin"
+
+
+async def _should_profile(request) -> bool:
+    if request.headers.get(PROFILE_HEADER):
+        authorization = request.headers.get("Authorization", "")
+        return await run_in_threadpool(_is_admin_token, authorization)
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _profiled_call(call):
+    @functools.wraps(call)
+    def wrapper(*args, **kwargs):
+        run = _current_run.get()
+        if run is None:
+            return call(*args, **kwargs)
+        run.profiler = cProfile.Profile()
+        return run.profiler.runcall(call, *args, **kwargs)
+    return wrapper
+
+
+class ProfilingRoute(APIRoute):
+    """
+    Route class that profiles a request when an admin sends the profile header,
+    or when it is picked by `PROFILE_SAMPLE_RATE`. Requests that are not picked
+    go straight to the normal handler.
+    """
+    def get_route_handler(self):
+        # Sync endpoints run in a worker thread, so the profiler is started there
+        if not asyncio.iscoroutinefunction(self.dependant.call):
+            self.dependant.call = _profiled_call(self.dependant.call)
+        handler = super().get_route_handler()
+        route = f"{self.endpoint.__module__.split('.')[-1]}.{self.name}"
+
+        async def profiling_handler(request):
+            if not await _should_profile(request):
+                return await handler(request)
+            run = ProfileRun(route, request.method, request.url.path)
+            token = _current_run.set(run)
+            start = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                run.wall_ms = (time.perf_counter() - start) * 1000
+                _current_run.reset(token)
+                _store(run)
+
+        return profiling_handler
@@ -0,0 +1,160 @@
+# replay.py
+"""
+Re-drive a captured request trace (see traffic.py) against a running instance
+and compare latency distributions between builds.
+
+    python replay.py run traces.jsonl --base-url http://localhost:8000 --speed 4 --token $TOKEN --out new.json
+    python replay.py compare old.json new.json
+
+Request bodies are rebuilt from their recorded shape, so writes use placeholder
+values. Point the replay at a local instance, never at production.
+"""
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from traffic import sample_from_shape
+
+
+def read_trace(path: str) -> list:
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return sorted(records, key=lambda record: record["ts"])
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize(latencies: dict, errors: dict) -> dict:
+    summary = {}
+    for route, values in sorted(latencies.items()):
+        summary[route] = {
+            "count": len(values),
+            "errors": errors.get(route, 0),
+            "mean_ms": round(statistics.mean(values), 3),
+            "p50_ms": round(percentile(values, 50), 3),
+            "p90_ms": round(percentile(values, 90), 3),
+            "p99_ms": round(percentile(values, 99), 3),
+            "max_ms": round(max(values), 3),
+        }
+    return summary
+
+
+def send_request(base_url: str, record: dict, token: str, timeout: float):
+    url = base_url.rstrip("/") + record["path"]
+    query = {key: value for key, value in record.get("query", {}).items() if value != "<redacted>"}
+    if query:
+        url += "?" + urlencode(query)
+    data = None
+    headers = {}
+    if record.get("body") is not None and not isinstance(record["body"], str):
+        data = json.dumps(sample_from_shape(record["body"])).encode()
+        headers["Content-Type"] = "application/json"
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    request = urllib.request.Request(url, data=data, headers=headers, method=record["method"])
+
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, OSError):
+        status = None
+    return (time.perf_counter() - start) * 1000, status
+
+
+def replay(records: list, base_url: str, speed: float, token: str, concurrency: int, timeout: float) -> dict:
+    """
+    Send every record at its original offset divided by `speed` (0 sends them back to back).
+    A response is an error when it fails, or when its status differs from the captured one.
+    """
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+
+    def run(record):
+        elapsed, status = send_request(base_url, record, token, timeout)
+        route = f"{record['method']} {record.get('route') or record['path']}"
+        with lock:
+            latencies[route].append(elapsed)
+            if status is None or status != record.get("status", status):
+                errors[route] += 1
+
+    if not records:
+        return {}
+    first_ts = records[0]["ts"]
+    replay_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for record in records:
+            if speed > 0:
+                delay = (record["ts"] - first_ts) / speed - (time.perf_counter() - replay_start)
+                if delay > 0:
+                    time.sleep(delay)
+            pool.submit(run, record)
+    return summarize(latencies, errors)
+
+
+def compare(before: dict, after: dict) -> list:
+    rows = []
+    for route in sorted(set(before) | set(after)):
+        old, new = before.get(route), after.get(route)
+        row = {"route": route}
+        for key in ("p50_ms", "p90_ms", "p99_ms"):
+            row[key] = (old or {}).get(key), (new or {}).get(key)
+            if old and new and old[key]:
+                row[key.replace("_ms", "_change_pct")] = round((new[key] - old[key]) / old[key] * 100, 1)
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured request traces.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="replay a trace and write a latency summary")
+    run_parser.add_argument("trace", help="JSONL trace written by TRACE_CAPTURE_PATH")
+    run_parser.add_argument("--base-url", default="http://localhost:8000")
+    run_parser.add_argument("--speed", type=float, default=1.0, help="1 = real time, 10 = ten times faster, 0 = no pauses")
+    run_parser.add_argument("--token", default=None, help="bearer token sent with every request")
+    run_parser.add_argument("--concurrency", type=int, default=32)
+    run_parser.add_argument("--timeout", type=float, default=30.0)
+    run_parser.add_argument("--out", default=None, help="write the summary to this JSON file")
+
+    compare_parser = commands.add_parser("compare", help="compare two replay summaries")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        summary = replay(read_trace(args.trace), args.base_url, args.speed, args.token, args.concurrency, args.timeout)
+        output = json.dumps(summary, indent=2)
+        if args.out:
+            with open(args.out, "w") as f:
+                f.write(output)
+        print(output)
+    else:
+        with open(args.before) as f:
+            before = json.load(f)
+        with open(args.after) as f:
+            after = json.load(f)
+        print(json.dumps(compare(before, after), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,30 @@
 import os
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from models import UserCreate, UserLogin, Token, UserBase
-from utilities import create_access_token, get_password_hash, verify_password
+from utilities import create_access_token, get_password_hash, get_password_hashes, verify_password
 from datetime import datetime, timedelta
-from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
+from pydantic import ValidationError
 from typing import List
 from jose import jwt, JWTError
 from dotenv import load_dotenv
+from profiling import ProfilingRoute
+from database import tenant_collection
+from tenancy import TenantLocal, current_tenant
+from write_behind import WriteBehindBuffer
 
 # Load environment variables
 load_dotenv()
 
 # MongoDB Configuration
-MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017/")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "tabserv")
 COLLECTION_NAME = "user"
 
-client = MongoClient(MONGO_URL)
-db = client[DATABASE_NAME]
-users_collection = db[COLLECTION_NAME]
+users_collection = tenant_collection(DATABASE_NAME, COLLECTION_NAME)
+
+# Login bookkeeping (date_last_login/token_expiry) is written behind the request
+user_bookkeeping = TenantLocal(lambda tenant: WriteBehindBuffer(users_collection.for_tenant(tenant)))
 
 # JWT Configuration
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
@@ -28,7 +33,7 @@ ALGORITHM = os.getenv("ALGORITHM", "HS256")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/user/login")
 
-user_router = APIRouter()
+user_router = APIRouter(route_class=ProfilingRoute)
 
 def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
@@ -64,10 +69,14 @@ def register_user(user: UserCreate, admin_user: dict = Depends(admin_required)):
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail="Username already exists"
         )
-    user_data = {
+    users_collection.insert_one(new_user_document(user, get_password_hash(user.password)))
+    return {"message": f"User {user.username} created successfully"}
+
+def new_user_document(user: UserCreate, hashed_password: str) -> dict:
+    return {
         "name": user.name,
         "username": user.username,
-        "hashed_password": get_password_hash(user.password),
+        "hashed_password": hashed_password,
         "privilege": user.privilege,
         "table": user.table,
         "date_created": datetime.utcnow(),
@@ -75,8 +84,65 @@ def register_user(user: UserCreate, admin_user: dict = Depends(admin_required)):
         "enable": True,
         "token_expiry": None
     }
-    users_collection.insert_one(user_data)
-    return {"message": f"User {user.username} created successfully"}
+
+def bulk_register_users(rows: List[dict]) -> dict:
+    """
+    Create many users at once. Duplicates are checked with one `$in` query,
+    passwords are hashed in parallel and the users are written with one
+    `insert_many`. Rows that fail are reported by their 1-based row number.
+    """
+    errors = []
+    users = []
+    for row_number, row in enumerate(rows, start=1):
+        try:
+            users.append((row_number, UserCreate(**row)))
+        except (ValidationError, TypeError) as e:
+            username = row.get("username") if isinstance(row, dict) else None
+            errors.append({"row": row_number, "username": username, "error": str(e)})
+
+    existing = {
+        user["username"]
+        for user in users_collection.find(
+            {"username": {"$in": [user.username for _, user in users]}}, {"username": 1}
+        )
+    } if users else set()
+
+    accepted = []
+    seen = set()
+    for row_number, user in users:
+        if user.username in existing:
+            errors.append({"row": row_number, "username": user.username, "error": "Username already exists"})
+        elif user.username in seen:
+            errors.append({"row": row_number, "username": user.username, "error": "Duplicate username in import"})
+        else:
+            seen.add(user.username)
+            accepted.append((row_number, user))
+
+    hashed_passwords = get_password_hashes([user.password for _, user in accepted])
+    documents = [
+        new_user_document(user, hashed_password)
+        for (_, user), hashed_password in zip(accepted, hashed_passwords)
+    ]
+
+    created = [user.username for _, user in accepted]
+    if documents:
+        try:
+            users_collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                row_number, user = accepted[write_error["index"]]
+                created.remove(user.username)
+                errors.append({"row": row_number, "username": user.username, "error": write_error.get("errmsg")})
+
+    errors.sort(key=lambda error: error["row"])
+    return {"created": created, "errors": errors}
+
+@user_router.post("/register_bulk")
+def register_users_bulk(rows: List[dict] = Body(...), admin_user: dict = Depends(admin_required)):
+    """
+    Register many users from a JSON list of user objects, with a per-row error report.
+    """
+    return bulk_register_users(rows)
 
 @user_router.post("/login", response_model=Token)
 def login_user(user_data: UserLogin):
@@ -93,12 +159,12 @@ def login_user(user_data: UserLogin):
             detail="User account is disabled"
         )
     access_token = create_access_token(
-        data={"sub": user["username"]}, 
+        data={"sub": user["username"], "tenant": current_tenant()}, 
         expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
-    users_collection.update_one(
-        {"_id": user["_id"]},
-        {"$set": {"date_last_login": datetime.utcnow(), "token_expiry": datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)}}
+    user_bookkeeping.set(
+        user["_id"],
+        {"date_last_login": datetime.utcnow(), "token_expiry": datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)}
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -119,9 +185,16 @@ def list_users(admin_user: dict = Depends(admin_required)):
             username=user["username"],
             privilege=user["privilege"],
             table=user.get("table")
-        ) for user in users_collection.find()
+        ) for user in users_collection.reporting.find()
     ]
 
+@user_router.get("/write_behind_stats")
+def write_behind_stats(admin_user: dict = Depends(admin_required)):
+    """
+    Flush size, lag and error counts of the login bookkeeping write-behind buffer.
+    """
+    return {**user_bookkeeping.stats, "pending": user_bookkeeping.pending()}
+
 @user_router.delete("/delete/{username}")
 def delete_user(username: str, admin_user: dict = Depends(admin_required)):
     if users_collection.delete_one({"username": username}).deleted_count == 0:
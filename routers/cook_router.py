@@ -1,25 +1,27 @@
-from fastapi import APIRouter, HTTPException, Depends
-from pymongo import MongoClient
+from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
 from router import get_current_user
+from database import tenant_collection
+from content_negotiation import NegotiatingRoute
+from cook_scheduler import cook_scheduler, CLOSED_ORDER_STATUSES, PENDING_STATUSES
+from order_events import order_waiters, LONG_POLL_MAX_SECONDS, LONG_POLL_DEFAULT_SECONDS
+from dashboard import dashboard
+from dish_availability import dish_availability, menu_waiters, dish_changed, dish_removed, MENU_KEY
 import os
 
 # MongoDB connection (adjust as needed)
 
 
-MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017/")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "hotel_db")
 COLLECTION_NAME = "dish_master"
 ORDER_COLLECTION_NAME = "orders"
-client = MongoClient(MONGO_URL)
-db = client[DATABASE_NAME]
-orders_collection = db[ORDER_COLLECTION_NAME]
-dishes_collection = db[COLLECTION_NAME]
+orders_collection = tenant_collection(DATABASE_NAME, ORDER_COLLECTION_NAME)
+dishes_collection = tenant_collection(DATABASE_NAME, COLLECTION_NAME)
 
 
-cook_router = APIRouter()
+cook_router = APIRouter(route_class=NegotiatingRoute)
 
 # Models
 class DishBase(BaseModel):
@@ -37,7 +39,9 @@ class DishBase(BaseModel):
 
 class OrderUpdate(BaseModel):
     status: str
-    cook: str
+    cook: Optional[str] = None  # Ignored, the logged-in cook is recorded
+    item_id: Optional[str] = None  # Updates the first pending item when not given
+    line: Optional[int] = None  # Index of the item in the order, as given by next_ticket
     updated_at: datetime = datetime.utcnow()
 
 
@@ -75,7 +79,8 @@ def list_pending_dishes(user: dict = Depends(get_current_user)):
 def update_order_status(order_id: str, update_data: OrderUpdate, user: dict = Depends(get_current_user)):
     """
     Modify the parameters of an order's `orders` field.
-    Updates: status, cook, and updated_at.
+    Updates: status, cook, and updated_at. The logged-in cook is recorded, and
+    dishes the scheduler assigned to another cook can't be updated.
     Only accessible to Cook users.
     """
     if user["user_type"] != "Cook":
@@ -85,20 +90,111 @@ def update_order_status(order_id: str, update_data: OrderUpdate, user: dict = De
     if not order:
         raise HTTPException(status_code=404, detail="Order not found.")
     
+    if order.get("order_status") in CLOSED_ORDER_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Order is {order['order_status']}.")
+    
+    # The order line to update: the one given, else the first pending line (of the
+    # given dish) that the scheduler hasn't assigned to another cook
+    cook = user["username"]
+    items = order.get("orders", [])
+    lines = [update_data.line] if update_data.line is not None else range(len(items))
+    candidates = [
+        n for n in lines
+        if 0 <= n < len(items) and items[n].get("status") in PENDING_STATUSES
+        and (not update_data.item_id or items[n].get("item_id") == update_data.item_id)
+    ]
+    if not candidates:
+        raise HTTPException(status_code=400, detail="No matching pending orders to update.")
+    line = next((n for n in candidates if cook_scheduler.assigned_cook(order_id, n) in (None, cook)), None)
+    if line is None:
+        assigned = cook_scheduler.assigned_cook(order_id, candidates[0])
+        raise HTTPException(status_code=403, detail=f"This dish is assigned to {assigned}.")
+    
+    updated_item = items[line]
+    # Conditional on the line still holding the same pending dish
     updated = orders_collection.update_one(
-        {"order_id": order_id, "orders.status": "pending"},
+        {
+            "order_id": order_id,
+            "order_status": {"$nin": list(CLOSED_ORDER_STATUSES)},
+            f"orders.{line}.item_id": updated_item["item_id"],
+            f"orders.{line}.status": {"$in": list(PENDING_STATUSES)},
+        },
         {"$set": {
-            "orders.$.status": update_data.status,
-            "orders.$.cook": update_data.cook,
-            "orders.$.updated_at": update_data.updated_at,
+            f"orders.{line}.status": update_data.status,
+            f"orders.{line}.cook": cook,
+            f"orders.{line}.updated_at": update_data.updated_at,
         }}
     )
     if updated.matched_count == 0:
-        raise HTTPException(status_code=400, detail="No matching pending orders to update.")
+        raise HTTPException(status_code=409, detail="The item was changed by another request, reload the order.")
+    
+    if update_data.status not in PENDING_STATUSES:
+        cook_scheduler.complete(order_id, line)
+    dashboard.item_status_changed(updated_item, update_data.status)
+    order_waiters.notify(order_id)
     
     return {"message": "Order updated successfully"}
 
 
+@cook_router.post("/start_shift", status_code=200)
+def start_shift(user: dict = Depends(get_current_user)):
+    """
+    Put the logged-in cook on shift so pending dishes get assigned to them.
+    Only accessible to Cook users.
+    """
+    if user["user_type"] != "Cook":
+        raise HTTPException(status_code=403, detail="Only cooks can start a shift.")
+    
+    tickets = cook_scheduler.start_shift(user["username"])
+    return {"message": "Shift started", "tickets": [ticket.to_dict() for ticket in tickets]}
+
+
+@cook_router.post("/end_shift", status_code=200)
+def end_shift(user: dict = Depends(get_current_user)):
+    """
+    Take the logged-in cook off shift. Their queued dishes go to the other cooks.
+    Only accessible to Cook users.
+    """
+    if user["user_type"] != "Cook":
+        raise HTTPException(status_code=403, detail="Only cooks can end a shift.")
+    
+    cook_scheduler.end_shift(user["username"])
+    return {"message": "Shift ended"}
+
+
+@cook_router.get("/next_ticket", status_code=200)
+def next_ticket(user: dict = Depends(get_current_user)):
+    """
+    Get the next dish assigned to the logged-in cook, oldest order first.
+    Only accessible to Cook users.
+    """
+    if user["user_type"] != "Cook":
+        raise HTTPException(status_code=403, detail="Only cooks can access this endpoint.")
+    
+    ticket = cook_scheduler.next_ticket(user["username"])
+    return {"ticket": ticket.to_dict() if ticket else None}
+
+
+@cook_router.get("/my_queue", status_code=200)
+def my_queue(user: dict = Depends(get_current_user)):
+    """
+    List all dishes assigned to the logged-in cook, in the order they should be cooked.
+    Only accessible to Cook users.
+    """
+    if user["user_type"] != "Cook":
+        raise HTTPException(status_code=403, detail="Only cooks can access this endpoint.")
+    
+    return {"tickets": [ticket.to_dict() for ticket in cook_scheduler.queue(user["username"])]}
+
+
+@cook_router.get("/kitchen_load", status_code=200)
+def kitchen_load(user: dict = Depends(get_current_user)):
+    """
+    Show the estimated backlog of every on-shift cook and the unassigned dish count.
+    """
+    return cook_scheduler.overview()
+
+
 @cook_router.post("/add_dish", status_code=201)
 def add_dish(dish: DishBase, user: dict = Depends(get_current_user)):
     """
@@ -114,6 +210,8 @@ def add_dish(dish: DishBase, user: dict = Depends(get_current_user)):
     dish.added_by = user["username"]
     dish.date_add = datetime.utcnow()
     dishes_collection.insert_one(dish.dict())
+    if dish.id:
+        dish_changed(dish.id, dish.available)
     return {"message": "Dish added successfully", "dish": dish}
 
 
@@ -133,6 +231,9 @@ def modify_dish(dish_id: str, dish: DishBase, user: dict = Depends(get_current_u
     if updated.matched_count == 0:
         raise HTTPException(status_code=404, detail="Dish not found.")
     
+    if dish.id and dish.id != dish_id:
+        dish_removed(dish_id)
+    dish_changed(dish.id or dish_id, dish.available)
     return {"message": "Dish modified successfully"}
 
 
@@ -149,4 +250,33 @@ def delete_dish(dish_id: str, user: dict = Depends(get_current_user)):
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Dish not found.")
     
+    dish_removed(dish_id)
     return {"message": "Dish deleted successfully"}
+
+
+@cook_router.get("/menu_availability", status_code=200)
+def menu_availability(user: dict = Depends(get_current_user)):
+    """
+    Availability of every dish, keyed by dish id, with the index `version`.
+    """
+    return dish_availability.snapshot()
+
+
+@cook_router.get("/menu_availability/wait", status_code=200)
+async def wait_menu_availability(
+    last_version: Optional[int] = None,
+    timeout: float = Query(LONG_POLL_DEFAULT_SECONDS, gt=0, le=LONG_POLL_MAX_SECONDS),
+    user: dict = Depends(get_current_user)
+):
+    """
+    Long-poll dish availability. Returns as soon as the index `version` differs
+    from `last_version`, or after `timeout` seconds with `changed` set to false.
+    Served from memory, tabs use it to grey out dishes the kitchen ran out of.
+    """
+    waiter = menu_waiters.register(MENU_KEY)
+    current = dish_availability.snapshot()
+    if current["version"] != last_version:
+        menu_waiters.unregister(MENU_KEY, waiter)
+        return {"changed": True, **current}
+    changed = await menu_waiters.wait(MENU_KEY, waiter, timeout)
+    return {"changed": changed, **dish_availability.snapshot()}
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, HTTPException, Depends
+from router import get_current_user
+from dashboard import dashboard
+
+dashboard_router = APIRouter()
+
+
+@dashboard_router.get("/live", status_code=200)
+def live_dashboard(user: dict = Depends(get_current_user)):
+    """
+    Open orders, occupied tables, pending dishes per station, today's revenue and
+    unpaid bills, served from in-memory counters.
+    Only accessible to Manager and admin users.
+    """
+    if user.get("user_type") != "Manager" and user.get("privilege") != "admin":
+        raise HTTPException(status_code=403, detail="Only managers can view the dashboard.")
+
+    return dashboard.snapshot()
@@ -1,20 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Query
 from router import get_current_user
-from pydantic import BaseModel, Field
+from database import tenant_collection
+from content_negotiation import NegotiatingRoute
+from cook_scheduler import cook_scheduler, PENDING_STATUSES
+from order_events import order_waiters, LONG_POLL_MAX_SECONDS, LONG_POLL_DEFAULT_SECONDS
+from dashboard import dashboard
+from dish_availability import dish_availability
+from order_export import iter_order_rows, csv_chunks, parquet_chunks
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError, parse_obj_as
+from pymongo import ReturnDocument
 from typing import List, Optional
-from datetime import datetime
-from pymongo import MongoClient
+from datetime import date, datetime, time
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import hashlib
 import os
 
 # MongoDB Configuration
-MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017/")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "hotel_db")
 COLLECTION_NAME = "orders"
-client = MongoClient(MONGO_URL)
-db = client[DATABASE_NAME]
-orders_collection = db[COLLECTION_NAME]
+orders_collection = tenant_collection(DATABASE_NAME, COLLECTION_NAME)
 
-order_router = APIRouter()
+order_router = APIRouter(route_class=NegotiatingRoute)
 
 # Pydantic models
 class OrderItem(BaseModel):
@@ -44,13 +52,27 @@ class Order(BaseModel):
     order_by: Optional[dict] = None  # Added automatically based on user
     user_name: Optional[str] = None  # Added automatically based on user
 
-# CRUD Endpoints@order_router.post("/create", response_model=Order)
+def ensure_available(items: List[dict]):
+    """
+    Reject items whose dish is marked unavailable, using the in-memory index.
+    """
+    unavailable = dish_availability.unavailable(item.get("item_id") for item in items)
+    if unavailable:
+        raise HTTPException(
+            status_code=400,
+            detail={"message": "Some dishes are not available.", "unavailable_items": unavailable},
+        )
+
+# CRUD Endpoints
+@order_router.post("/create", response_model=Order)
 def create_order(order: Order, user: dict = Depends(get_current_user)):
     """
     Create a new order. Automatically assigns the logged-in user's username and role to 'order_by'.
     """
     order_dict = order.dict()
-    order_dict["order_by"] = {"username": user["username"], "role": user["role"]}
+    ensure_available(order_dict["orders"])
+    order_dict["order_by"] = {"username": user["username"], "role": user["privilege"]}
+    order_dict["paid_at"] = datetime.utcnow() if order.payment_status == "paid" else None
     
     # Insert the order into the database and retrieve the ID
     result = orders_collection.insert_one(order_dict)
@@ -59,9 +81,31 @@ def create_order(order: Order, user: dict = Depends(get_current_user)):
     # Update the order dictionary with the ID
     order_dict["order_id"] = order_id
     
+    # Queue the dishes for the kitchen
+    cook_scheduler.add_order(order_dict)
+    dashboard.order_created(order_dict)
+    
     return order_dict
 
 
+def reschedule_items(order_id: str, order: dict, items: List[dict]):
+    """
+    Bring the cook scheduler in line with an order's new item list. Tickets
+    are per line; a line keeps its ticket (and cook) while it holds the same
+    dish and is still pending.
+    """
+    for line, item in enumerate(order.get("orders", [])):
+        kept = (
+            line < len(items)
+            and items[line].get("item_id") == item.get("item_id")
+            and items[line].get("status") in PENDING_STATUSES
+        )
+        if not kept:
+            cook_scheduler.complete(order_id, line)
+    for line, item in enumerate(items):
+        cook_scheduler.add_item(order_id, line, item, order.get("table"), order.get("order_date_time"))
+
+
 #order_id is mongodb collection _id field
 @order_router.get("/status/{order_id}")
 def get_order_status(order_id: str, user: dict = Depends(get_current_user)):
@@ -74,6 +118,46 @@ def get_order_status(order_id: str, user: dict = Depends(get_current_user)):
     return {"order_id": order_id, "order_status": order["order_status"]}
 
 
+def order_state(order: dict) -> dict:
+    """
+    The parts of an order a table watches, with a short token identifying them.
+    """
+    items = [{"item_id": item["item_id"], "status": item["status"]} for item in order.get("orders", [])]
+    digest = hashlib.sha1(repr((order["order_status"], items)).encode()).hexdigest()[:16]
+    return {"order_status": order["order_status"], "items": items, "state": digest}
+
+
+@order_router.get("/status/{order_id}/wait")
+async def wait_order_status(
+    order_id: str,
+    last_state: Optional[str] = None,
+    timeout: float = Query(LONG_POLL_DEFAULT_SECONDS, gt=0, le=LONG_POLL_MAX_SECONDS),
+    user: dict = Depends(get_current_user)
+):
+    """
+    Long-poll the status of an order. Returns as soon as the order status or any
+    item status differs from `last_state` (the `state` of a previous response),
+    or after `timeout` seconds with `changed` set to false.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        waiter = order_waiters.register(order_id)
+        order = await run_in_threadpool(
+            orders_collection.find_one, {"_id": order_id}, {"order_status": 1, "orders.item_id": 1, "orders.status": 1}
+        )
+        if not order:
+            order_waiters.unregister(order_id, waiter)
+            raise HTTPException(status_code=404, detail="Order not found.")
+        current = order_state(order)
+        remaining = deadline - loop.time()
+        if current["state"] != last_state or remaining <= 0:
+            order_waiters.unregister(order_id, waiter)
+            return {"order_id": order_id, "changed": current["state"] != last_state, **current}
+        if not await order_waiters.wait(order_id, waiter, remaining):
+            return {"order_id": order_id, "changed": False, **current}
+
+
 @order_router.put("/update/{order_id}")
 def update_order(order_id: str, updated_items: List[OrderItem], user: dict = Depends(get_current_user)):
     """
@@ -83,10 +167,17 @@ def update_order(order_id: str, updated_items: List[OrderItem], user: dict = Dep
     if not order:
         raise HTTPException(status_code=404, detail="Order not found.")
     
+    items = [item.dict() for item in updated_items]
+    # Items already on the order stay, only added ones are checked
+    current_ids = {item["item_id"] for item in order.get("orders", [])}
+    ensure_available([item for item in items if item["item_id"] not in current_ids])
     orders_collection.update_one(
         {"order_id": order_id},
-        {"$set": {"orders": [item.dict() for item in updated_items]}}
+        {"$set": {"orders": items}}
     )
+    reschedule_items(order_id, order, items)
+    dashboard.items_replaced(order["orders"], items)
+    order_waiters.notify(order_id)
     return {"message": "Order updated successfully."}
 
 
@@ -105,10 +196,21 @@ def cancel_order(order_id: str, user: dict = Depends(get_current_user)):
             detail="Order cannot be cancelled as it is not in 'ordered' status."
         )
     
-    orders_collection.update_one(
-        {"order_id": order_id},
-        {"$set": {"order_status": "cancelled"}}
+    # Conditional on the status, so a repeated or concurrent cancel changes nothing
+    order = orders_collection.find_one_and_update(
+        {"order_id": order_id, "order_status": "ordered"},
+        {"$set": {"order_status": "cancelled"}},
+        return_document=ReturnDocument.BEFORE
     )
+    if order is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Order cannot be cancelled as it is not in 'ordered' status."
+        )
+    for line in range(len(order.get("orders", []))):
+        cook_scheduler.complete(order_id, line)
+    dashboard.order_cancelled(order)
+    order_waiters.notify(order_id)
     return {"message": "Order cancelled successfully."}
 
 
@@ -139,9 +241,47 @@ def get_all_orders(user: dict = Depends(get_current_user)):
     """
     Get all orders for the logged-in user.
     """
-    orders = list(orders_collection.find({"order_by.username": user["username"]}))
+    orders = list(orders_collection.reporting.find({"order_by.username": user["username"]}))
     return {"orders": orders}
 
+
+@order_router.get("/export")
+def export_orders(
+    start: date,
+    end: date,
+    format: str = Query("csv", regex="^(csv|parquet)$"),
+    user: dict = Depends(get_current_user)
+):
+    """
+    Export the orders placed from `start` up to (not including) `end` for accounting,
+    one row per order item.
+    The file is streamed from the database cursor, as CSV or as Parquet row groups.
+    Access is restricted to users with admin or billing privileges.
+    """
+    if user["privilege"] not in ["admin", "billing"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Permission denied"
+        )
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start.")
+
+    rows = iter_order_rows(orders_collection.reporting, datetime.combine(start, time.min), datetime.combine(end, time.min))
+    filename = f"orders-{start:%Y%m%d}-{end:%Y%m%d}.{format}"
+    if format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Parquet export needs pyarrow installed.")
+        chunks, media_type = parquet_chunks(rows), "application/vnd.apache.parquet"
+    else:
+        chunks, media_type = csv_chunks(rows), "text/csv"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 #################################################
 
 @order_router.put("/modify_order_items/{order_id}")
@@ -167,9 +307,14 @@ def modify_order_items(
         )
     
     # Extract modifications
+    previous_items = [dict(item) for item in order["orders"]]
     takeaway_items = modifications.get("takeaway_items", [])  # List of item IDs to mark as takeaway
     cancel_items = modifications.get("cancel_items", [])      # List of item IDs to cancel
     new_items = modifications.get("new_items", [])            # List of new items to add
+    try:
+        new_items = [item.dict() for item in parse_obj_as(List[OrderItem], new_items)]
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
     
     updated_orders = []
 
@@ -187,6 +332,7 @@ def modify_order_items(
         updated_orders.append(item)
 
     # Step 2: Add new items
+    ensure_available(new_items)
     for new_item in new_items:
         updated_orders.append(new_item)
 
@@ -195,6 +341,9 @@ def modify_order_items(
         {"order_id": order_id},
         {"$set": {"orders": updated_orders}}
     )
+    reschedule_items(order_id, order, updated_orders)
+    dashboard.items_replaced(previous_items, updated_orders)
+    order_waiters.notify(order_id)
 
     return {
         "message": "Order items updated successfully.",
@@ -248,11 +397,15 @@ def set_billing_status(order_id: str, status: str, user: dict = Depends(get_curr
     if not order:
         raise HTTPException(status_code=404, detail="Order not found.")
 
-    # Update the order in the database
-    orders_collection.update_one(
-        {"order_id": order_id},
-        {"$set": {"payment_status": status}}
+    # Update the order in the database. Conditional on the current status, so
+    # the counters change once however often the same status is sent.
+    previous = orders_collection.find_one_and_update(
+        {"order_id": order_id, "payment_status": {"$ne": status}},
+        {"$set": {"payment_status": status, "paid_at": datetime.utcnow() if status == "paid" else None}},
+        return_document=ReturnDocument.BEFORE
     )
+    if previous is not None:
+        dashboard.payment_status_changed(previous, status)
 
     return {
         "message": "Order billing status updated successfully.",
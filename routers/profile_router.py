@@ -0,0 +1,40 @@
+from fastapi import APIRouter, HTTPException, Depends, Response
+from router import admin_required
+from profiling import list_profiles, get_profile
+
+profile_router = APIRouter()
+
+
+@profile_router.get("/list", status_code=200)
+def list_captured_profiles(admin_user: dict = Depends(admin_required)):
+    """
+    List the captured request profiles, newest first.
+    Only accessible to admin users.
+    """
+    return {"profiles": list_profiles()}
+
+
+@profile_router.get("/{profile_id}", status_code=200)
+def get_captured_profile(profile_id: int, admin_user: dict = Depends(admin_required)):
+    """
+    Get the Mongo/Python time split and the top functions of a captured profile.
+    """
+    run = get_profile(profile_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    return {**run.summary(), "stats": run.stats_text()}
+
+
+@profile_router.get("/{profile_id}/download", status_code=200)
+def download_profile(profile_id: int, admin_user: dict = Depends(admin_required)):
+    """
+    Download a captured profile as a pstats file (readable with `pstats` or snakeviz).
+    """
+    run = get_profile(profile_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    return Response(
+        content=run.dump(),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.prof"'},
+    )
@@ -1,25 +1,25 @@
 from fastapi import APIRouter, HTTPException, Depends, Body
-from pymongo import MongoClient
 from pydantic import BaseModel
+from pymongo import ReturnDocument
 from typing import List, Optional
 from datetime import datetime
 from router import get_current_user
+from database import tenant_collection
+from content_negotiation import NegotiatingRoute
+from dashboard import dashboard
 import os
 
 # MongoDB connection (adjust as needed)
 
 
-MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017/")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "hotel_db")
 COLLECTION_NAME = "tabs"
-client = MongoClient(MONGO_URL)
-db = client[DATABASE_NAME]
-orders_collection = db[COLLECTION_NAME]
+tabs_collection = tenant_collection(DATABASE_NAME, COLLECTION_NAME)
 
 
 
 
-tab_router = APIRouter()
+tab_router = APIRouter(route_class=NegotiatingRoute)
 
 # Models
 class TabBase(BaseModel):
@@ -47,6 +47,7 @@ def add_tab(tab: TabBase, user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=400, detail="Tab name already exists.")
     
     tabs_collection.insert_one(tab.dict())
+    dashboard.table_changed(None, tab.table)
     return {"message": "Tab added successfully", "tab": tab}
 
 
@@ -58,10 +59,11 @@ def delete_tab(tab_name: str, user: dict = Depends(get_current_user)):
     if user["user_type"] != "Manager":
         raise HTTPException(status_code=403, detail="Only admins can delete tabs.")
     
-    result = tabs_collection.delete_one({"name": tab_name})
-    if result.deleted_count == 0:
+    tab = tabs_collection.find_one_and_delete({"name": tab_name})
+    if tab is None:
         raise HTTPException(status_code=404, detail="Tab not found.")
     
+    dashboard.table_changed(tab.get("table"), None)
     return {"message": "Tab deleted successfully"}
 
 
@@ -89,14 +91,16 @@ def update_table(tab_name: str, table: int, user: dict = Depends(get_current_use
     """
     Update the table number for a tab.
     """
-    tab = tabs_collection.find_one({"name": tab_name})
+    # The tab as it was before this write, so the occupied count moves by what actually changed
+    tab = tabs_collection.find_one_and_update(
+        {"name": tab_name},
+        {"$set": {"table": table, "user": user["username"], "user_type": user["user_type"]}},
+        return_document=ReturnDocument.BEFORE
+    )
     if not tab:
         raise HTTPException(status_code=404, detail="Tab not found.")
     
-    tabs_collection.update_one(
-        {"name": tab_name},
-        {"$set": {"table": table, "user": user["username"], "user_type": user["user_type"]}}
-    )
+    dashboard.table_changed(tab.get("table"), table)
     return {"message": "Table number updated successfully"}
 
 
@@ -0,0 +1,215 @@
+# soak.py
+"""
+Soak test: serve the app in this process against a local MongoDB stand-in, drive
+traffic at it for hours and track memory. Every interval a tracemalloc snapshot
+is compared with the one taken after warm-up, and RSS, thread count and the top
+allocation-growth sites are recorded. Exits non-zero when growth exceeds the budget.
+
+    MONGO_URL=mongodb://localhost:27017 python soak.py --trace traces.jsonl --token $TOKEN \\
+        --hours 4 --interval 300 --rss-budget-mb 64 --report soak.json
+
+Traffic is a captured trace (see traffic.py) replayed in a loop, or, without
+--trace, a mix of the read endpoints tablets poll, which needs --token. 4xx
+responses are counted apart from failures. Never point it at production.
+"""
+import argparse
+import fnmatch
+import itertools
+import json
+import logging
+import sys
+import threading
+import time
+import tracemalloc
+
+import uvicorn
+
+from replay import read_trace, send_request
+
+logger = logging.getLogger("soak")
+
+# Endpoints polled by tablets and the kitchen, used when no trace is given
+DEFAULT_TRAFFIC = [
+    {"method": "GET", "path": "/tabs/list_tabs"},
+    {"method": "GET", "path": "/order/all"},
+    {"method": "GET", "path": "/user/me"},
+    {"method": "GET", "path": "/cook/kitchen_load"},
+    {"method": "GET", "path": "/cook/list_pending_dishes"},
+]
+
+TOP_SITES = 15
+
+# The traffic client shares the process, keep its allocations out of the report
+IGNORED_SITES = [tracemalloc.__file__, "*/urllib/*", "*/http/client.py", "*/replay.py"]
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Not Linux: peak RSS is the best available
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def start_server(port: int, timeout: float = 60.0) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config("main:app", host="127.0.0.1", port=port, log_level="warning"))
+    # Signals belong to the main thread, which runs the soak loop
+    server.install_signal_handlers = lambda: None
+    thread = threading.Thread(target=server.run, name="soak-server", daemon=True)
+    thread.start()
+    deadline = time.monotonic() + timeout
+    while not server.started:
+        # uvicorn exits its thread when the port is taken or startup fails
+        if not thread.is_alive():
+            raise RuntimeError(f"Server failed to start on port {port}")
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Server did not start within {timeout}s")
+        time.sleep(0.1)
+    return server
+
+
+class TrafficDriver:
+    def __init__(self, base_url: str, records: list, token: str, workers: int, pause: float):
+        self.base_url = base_url
+        self.records = records
+        self.token = token
+        self.workers = workers
+        self.pause = pause
+        self.requests = 0
+        self.failures = 0
+        self.client_errors = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def start(self):
+        for worker in range(self.workers):
+            threading.Thread(target=self._run, args=(worker,), name=f"soak-traffic-{worker}", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, worker: int):
+        # Workers start at different points of the trace
+        records = itertools.islice(itertools.cycle(self.records), worker * 7, None)
+        for record in records:
+            if self._stop.is_set():
+                return
+            _, status = send_request(self.base_url, record, self.token, timeout=30)
+            with self._lock:
+                self.requests += 1
+                if status is None or status >= 500:
+                    self.failures += 1
+                elif status >= 400:
+                    self.client_errors += 1
+            if self.pause:
+                self._stop.wait(self.pause)
+
+
+def growth_sites(snapshot, baseline) -> list:
+    stats = [
+        stat for stat in snapshot.compare_to(baseline, "lineno")
+        if not any(fnmatch.fnmatch(stat.traceback[0].filename, pattern) for pattern in IGNORED_SITES)
+    ]
+    return [
+        {
+            "site": str(stat.traceback[0]),
+            "size_diff_kb": round(stat.size_diff / 1024, 1),
+            "count_diff": stat.count_diff,
+        }
+        for stat in stats[:TOP_SITES]
+        if stat.size_diff > 0
+    ]
+
+
+def sample(started: float, driver: TrafficDriver) -> dict:
+    traced, _ = tracemalloc.get_traced_memory()
+    return {
+        "elapsed_s": round(time.monotonic() - started, 1),
+        "rss_mb": round(rss_mb(), 1),
+        "traced_mb": round(traced / (1024 * 1024), 1),
+        "threads": threading.active_count(),
+        "requests": driver.requests,
+        "failures": driver.failures,
+        "client_errors": driver.client_errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-running soak test with memory growth tracking.")
+    parser.add_argument("--trace", default=None, help="JSONL trace to replay in a loop")
+    parser.add_argument("--token", default=None, help="bearer token sent with every request, required without --trace")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--workers", type=int, default=8, help="concurrent traffic threads")
+    parser.add_argument("--pause", type=float, default=0.05, help="seconds each worker waits between requests")
+    parser.add_argument("--hours", type=float, default=2.0)
+    parser.add_argument("--warmup", type=float, default=120.0, help="seconds before the baseline snapshot")
+    parser.add_argument("--interval", type=float, default=300.0, help="seconds between snapshots")
+    parser.add_argument("--rss-budget-mb", type=float, default=64.0, help="allowed RSS growth after warm-up")
+    parser.add_argument("--traced-budget-mb", type=float, default=32.0, help="allowed Python heap growth after warm-up")
+    parser.add_argument("--thread-budget", type=int, default=8, help="allowed thread count growth after warm-up")
+    parser.add_argument("--report", default="soak_report.json")
+    args = parser.parse_args()
+    if not args.trace and not args.token:
+        # Every default endpoint needs a login, without one only the 401 path gets soaked
+        parser.error("--token is required for the default traffic mix")
+
+    logging.basicConfig(level=logging.INFO)
+    tracemalloc.start(10)
+
+    records = read_trace(args.trace) if args.trace else DEFAULT_TRAFFIC
+    start_server(args.port)
+    driver = TrafficDriver(f"http://127.0.0.1:{args.port}", records, args.token, args.workers, args.pause)
+    started = time.monotonic()
+    driver.start()
+
+    time.sleep(args.warmup)
+    baseline_snapshot = tracemalloc.take_snapshot()
+    baseline = sample(started, driver)
+    samples = [baseline]
+    logger.info(f"baseline: {baseline}")
+    if baseline["requests"] and baseline["client_errors"] == baseline["requests"]:
+        logger.error("Every request was rejected with a 4xx during warm-up, check --token")
+        driver.stop()
+        return 2
+
+    deadline = started + args.hours * 3600
+    sites = []
+    while time.monotonic() < deadline:
+        time.sleep(max(min(args.interval, deadline - time.monotonic()), 0))
+        current = sample(started, driver)
+        sites = growth_sites(tracemalloc.take_snapshot(), baseline_snapshot)
+        samples.append(current)
+        logger.info(f"sample: {current}")
+        for site in sites[:5]:
+            logger.info(f"  +{site['size_diff_kb']}KB {site['site']}")
+    driver.stop()
+
+    final = samples[-1]
+    growth = {
+        "rss_mb": round(final["rss_mb"] - baseline["rss_mb"], 1),
+        "traced_mb": round(final["traced_mb"] - baseline["traced_mb"], 1),
+        "threads": final["threads"] - baseline["threads"],
+    }
+    violations = []
+    if growth["rss_mb"] > args.rss_budget_mb:
+        violations.append(f"RSS grew {growth['rss_mb']}MB (budget {args.rss_budget_mb}MB)")
+    if growth["traced_mb"] > args.traced_budget_mb:
+        violations.append(f"Python heap grew {growth['traced_mb']}MB (budget {args.traced_budget_mb}MB)")
+    if growth["threads"] > args.thread_budget:
+        violations.append(f"thread count grew by {growth['threads']} (budget {args.thread_budget})")
+
+    report = {"growth": growth, "violations": violations, "top_growth_sites": sites, "samples": samples}
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps({"growth": growth, "violations": violations}, indent=2))
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
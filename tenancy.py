@@ -0,0 +1,144 @@
+# tenancy.py
+import json
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Tenancy Configuration
+# DEFAULT_TENANT keeps the original database names, so a single-outlet
+# deployment needs no configuration. Other outlets are listed in TENANTS.
+DEFAULT_TENANT = os.getenv("DEFAULT_TENANT", "default")
+TENANTS = {DEFAULT_TENANT} | {t.strip() for t in os.getenv("TENANTS", "").split(",") if t.strip()}
+# Explicit host to tenant mapping, e.g. "jubilee.example.com=jubilee,mg.example.com=mgroad"
+TENANT_HOSTS = {
+    host.strip().lower(): tenant.strip()
+    for host, tenant in (entry.split("=", 1) for entry in os.getenv("TENANT_HOSTS", "").split(",") if "=" in entry)
+}
+TENANT_CLAIM = "tenant"
+
+_current_tenant: ContextVar[str] = ContextVar("tenant", default=DEFAULT_TENANT)
+
+
+def current_tenant() -> str:
+    return _current_tenant.get()
+
+
+@contextmanager
+def tenant_context(tenant: str):
+    """
+    Run a block (startup jobs, CLI scripts) as the given tenant.
+    """
+    token = _current_tenant.set(tenant)
+    try:
+        yield tenant
+    finally:
+        _current_tenant.reset(token)
+
+
+def _token_claims(authorization: str) -> Optional[dict]:
+    # Imported lazily, router.py depends on this module through database.py
+    from jose import JWTError, jwt
+    from router import ALGORITHM, SECRET_KEY
+
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+
+
+def _tenant_from_host(host: str) -> Optional[str]:
+    host = host.split(":")[0].lower()
+    if host in TENANT_HOSTS:
+        return TENANT_HOSTS[host]
+    subdomain = host.split(".")[0]
+    return subdomain if subdomain in TENANTS else None
+
+
+def resolve_tenant(headers: Dict[str, str]) -> Optional[str]:
+    """
+    The tenant of a request. A valid token decides on its own: its tenant
+    claim, or the default tenant for tokens issued before claims existed, so
+    a client-controlled Host header can't move a token to another outlet.
+    Other requests (login) use the Host header, then the default tenant.
+    Returns None for a tenant that isn't configured.
+    """
+    claims = _token_claims(headers["authorization"]) if headers.get("authorization") else None
+    if claims is not None:
+        tenant = claims.get(TENANT_CLAIM) or DEFAULT_TENANT
+    else:
+        tenant = _tenant_from_host(headers["host"]) if headers.get("host") else None
+    tenant = tenant or DEFAULT_TENANT
+    return tenant if tenant in TENANTS else None
+
+
+class TenantMiddleware:
+    """
+    ASGI middleware that resolves the tenant of each request and makes it
+    the current tenant for everything the request does.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        tenant = resolve_tenant(headers)
+        if tenant is None:
+            body = json.dumps({"detail": "Unknown tenant"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 404,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        token = _current_tenant.set(tenant)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_tenant.reset(token)
+
+
+class TenantLocal:
+    """
+    One instance of some in-process state per tenant, created on first use
+    by `factory(tenant)`. Attribute access goes to the current tenant's
+    instance, so the object can be used wherever a single instance was.
+    """
+    def __init__(self, factory: Callable[[str], object]):
+        self._factory = factory
+        self._instances: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def for_tenant(self, tenant: str):
+        instance = self._instances.get(tenant)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(tenant)
+                if instance is None:
+                    instance = self._instances[tenant] = self._factory(tenant)
+        return instance
+
+    def current(self):
+        return self.for_tenant(current_tenant())
+
+    def all(self) -> Dict[str, object]:
+        with self._lock:
+            return dict(self._instances)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.current(), name)
@@ -0,0 +1,60 @@
+import asyncio
+import json
+from datetime import datetime
+
+import msgpack
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from content_negotiation import OBJECT_ID_EXT_TYPE, _as_json_request, packb, unpackb
+
+
+def msgpack_request(body: bytes) -> Request:
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/order/create",
+        "headers": [(b"content-type", b"application/msgpack"), (b"content-length", str(len(body)).encode())],
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return Request(scope, receive)
+
+
+def as_json(body: bytes):
+    async def convert():
+        request = await _as_json_request(msgpack_request(body))
+        return request.headers["content-type"], json.loads(await request.body())
+
+    return asyncio.run(convert())
+
+
+def test_round_trip_keeps_datetimes_and_object_ids():
+    value = {"_id": ObjectId(), "date": datetime(2024, 1, 1, 10, 30), "items": [1, "two"]}
+    unpacked = unpackb(packb(value))
+    assert unpacked["_id"] == value["_id"]
+    assert unpacked["date"].replace(tzinfo=None) == value["date"]
+    assert unpacked["items"] == [1, "two"]
+
+
+def test_msgpack_body_is_reissued_as_json():
+    content_type, body = as_json(packb({"table": "4", "date": datetime(2024, 1, 1), "quantity": 2}))
+    assert content_type == "application/json"
+    assert body == {"table": "4", "date": "2024-01-01T00:00:00+00:00", "quantity": 2}
+
+
+@pytest.mark.parametrize("body", [
+    b"",
+    b"\xc1abc",
+    b"\x92\x01",
+    b"\x01\x02",
+    msgpack.packb(msgpack.ExtType(OBJECT_ID_EXT_TYPE, b"abc")),
+])
+def test_malformed_msgpack_body_is_rejected_with_400(body):
+    with pytest.raises(HTTPException) as error:
+        as_json(body)
+    assert error.value.status_code == 400
@@ -0,0 +1,158 @@
+from datetime import datetime, timedelta
+
+from cook_scheduler import CookScheduler, estimate_prep_minutes
+
+START = datetime(2024, 1, 1, 12, 0)
+
+
+def item(item_id, type="Starter", status="ordered", quantity=1):
+    return {"item_id": item_id, "item": item_id, "type": type, "status": status, "quantity": quantity}
+
+
+def add(scheduler, order_id, item_id, line=0, minutes_after=0, **kwargs):
+    scheduler.add_item(order_id, line, item(item_id, **kwargs), "1", START + timedelta(minutes=minutes_after))
+
+
+def keys(tickets):
+    return [(ticket.order_id, ticket.item_id) for ticket in tickets]
+
+
+def test_estimate_prep_minutes():
+    assert estimate_prep_minutes(item("a", type="Main Course")) == 20
+    assert estimate_prep_minutes(item("a", type="Drinks", quantity=3)) == 6
+    assert estimate_prep_minutes(item("a", type="unknown")) == 10
+
+
+def test_ticket_goes_to_least_loaded_cook():
+    scheduler = CookScheduler()
+    scheduler.start_shift("asha")
+    scheduler.start_shift("ravi")
+    add(scheduler, "o1", "main", type="Main Course")
+    add(scheduler, "o2", "drink", type="Drinks")
+    add(scheduler, "o3", "soup", type="Starter")
+
+    # 20 minutes for asha, then ravi takes both smaller dishes (3 + 10)
+    assert keys(scheduler.queue("asha")) == [("o1", "main")]
+    assert keys(scheduler.queue("ravi")) == [("o2", "drink"), ("o3", "soup")]
+    assert scheduler.overview()["cooks"]["ravi"]["backlog_minutes"] == 13
+
+
+def test_queue_is_oldest_order_first():
+    scheduler = CookScheduler()
+    scheduler.start_shift("asha")
+    add(scheduler, "late", "a", minutes_after=10)
+    add(scheduler, "early", "b", minutes_after=0)
+    assert keys(scheduler.queue("asha")) == [("early", "b"), ("late", "a")]
+    assert scheduler.next_ticket("asha").order_id == "early"
+
+
+def test_only_pending_lines_are_queued_once():
+    scheduler = CookScheduler()
+    scheduler.start_shift("asha")
+    add(scheduler, "o1", "a", line=0, status="pending")
+    add(scheduler, "o1", "a", line=0, status="pending")
+    add(scheduler, "o1", "b", line=1, status="completed")
+    assert keys(scheduler.queue("asha")) == [("o1", "a")]
+
+
+def test_same_dish_twice_in_an_order_gets_two_tickets():
+    scheduler = CookScheduler()
+    scheduler.start_shift("asha")
+    scheduler.add_order({
+        "order_id": "o1",
+        "table": "1",
+        "order_date_time": START,
+        "orders": [item("soup"), {**item("soup"), "takeaway": True}],
+    })
+    assert [ticket.line for ticket in scheduler.queue("asha")] == [0, 1]
+    assert scheduler.overview()["cooks"]["asha"]["backlog_minutes"] == 20
+
+    scheduler.complete("o1", 0)
+    assert [ticket.line for ticket in scheduler.queue("asha")] == [1]
+    assert scheduler.next_ticket("asha").to_dict()["line"] == 1
+
+
+def test_tickets_wait_until_a_cook_starts():
+    scheduler = CookScheduler()
+    add(scheduler, "o2", "b", minutes_after=5)
+    add(scheduler, "o1", "a")
+    assert scheduler.overview()["unassigned"] == 2
+
+    queue = scheduler.start_shift("asha")
+    assert keys(queue) == [("o1", "a"), ("o2", "b")]
+    assert scheduler.overview()["unassigned"] == 0
+
+
+def test_end_shift_reassigns_queue():
+    scheduler = CookScheduler()
+    scheduler.start_shift("asha")
+    scheduler.start_shift("ravi")
+    for n in range(4):
+        add(scheduler, f"o{n}", "a", minutes_after=n)
+
+    scheduler.end_shift("asha")
+    assert scheduler.on_shift() == ["ravi"]
+    assert keys(scheduler.queue("ravi")) == [(f"o{n}", "a") for n in range(4)]
+    assert scheduler.next_ticket("asha") is None
+
+    scheduler.end_shift("ravi")
+    assert scheduler.overview()["unassigned"] == 4
+
+
+def test_complete_skips_stale_heap_entries():
+    scheduler = CookScheduler()
+    scheduler.start_shift("asha")
+    add(scheduler, "o1", "a", type="Main Course")
+    add(scheduler, "o2", "b", minutes_after=1)
+
+    assert scheduler.complete("o1", 0).item_id == "a"
+    assert scheduler.complete("o1", 0) is None
+    assert scheduler.next_ticket("asha").key == ("o2", 0)
+    assert scheduler.overview()["cooks"]["asha"]["backlog_minutes"] == 10
+
+    scheduler.complete("o2", 0)
+    assert scheduler.next_ticket("asha") is None
+    assert scheduler.overview()["cooks"]["asha"] == {"backlog_minutes": 0, "tickets": 0}
+
+
+def test_backlog_follows_completions():
+    scheduler = CookScheduler()
+    scheduler.start_shift("asha")
+    scheduler.start_shift("ravi")
+    add(scheduler, "o1", "a", type="Main Course")
+    add(scheduler, "o2", "b", type="Starter")
+    scheduler.complete("o1", 0)
+
+    # asha is idle again, so the next dish goes to asha ahead of ravi
+    add(scheduler, "o3", "c", type="Starter")
+    assert keys(scheduler.queue("asha")) == [("o3", "c")]
+
+
+def test_startup_load_skips_closed_orders():
+    from cook_scheduler import CLOSED_ORDER_STATUSES, cook_scheduler, load_pending_tickets
+    from tenancy import tenant_context
+
+    class FakeOrders:
+        def find(self, filter, projection):
+            self.filter = filter
+            return iter([{"order_id": "o1", "order_date_time": START, "orders": [item("soup")]}])
+
+    orders = FakeOrders()
+    with tenant_context("startup-load"):
+        load_pending_tickets(orders)
+        assert cook_scheduler.overview()["unassigned"] == 1
+    assert orders.filter["order_status"] == {"$nin": list(CLOSED_ORDER_STATUSES)}
+
+
+def test_assigned_cook_follows_reassignment():
+    scheduler = CookScheduler()
+    scheduler.start_shift("asha")
+    scheduler.start_shift("ravi")
+    add(scheduler, "o1", "soup", line=0)
+    add(scheduler, "o1", "soup", line=1)
+    assert (scheduler.assigned_cook("o1", 0), scheduler.assigned_cook("o1", 1)) == ("asha", "ravi")
+
+    scheduler.end_shift("asha")
+    assert scheduler.assigned_cook("o1", 0) == "ravi"
+    scheduler.complete("o1", 0)
+    assert scheduler.assigned_cook("o1", 0) is None
@@ -0,0 +1,220 @@
+from datetime import datetime, timedelta
+
+import dashboard as dashboard_module
+from dashboard import DashboardCounters
+
+
+def order(status="ordered", payment="unpaid", bill=100.0, items=()):
+    return {"order_status": status, "payment_status": payment, "bill_amount": bill, "orders": list(items)}
+
+
+def item(type="Starter", status="ordered"):
+    return {"item_id": "i", "type": type, "status": status}
+
+
+class FakeOrders:
+    def __init__(self, result):
+        self.result = result
+        self.pipeline = None
+
+    def aggregate(self, pipeline):
+        self.pipeline = pipeline
+        return iter([self.result])
+
+
+class MemoryOrders:
+    """
+    Runs the dashboard's seed pipeline over in-memory documents. Supports
+    only the operators the pipeline uses.
+    """
+    def __init__(self, documents):
+        self.documents = documents
+
+    def aggregate(self, pipeline):
+        facets = pipeline[0]["$facet"]
+        return iter([{name: self._run(stages) for name, stages in facets.items()}])
+
+    def _run(self, stages):
+        documents = list(self.documents)
+        for stage in stages:
+            (operator, spec), = stage.items()
+            if operator == "$match":
+                documents = [document for document in documents if _matches(document, spec)]
+            elif operator == "$count":
+                documents = [{spec: len(documents)}] if documents else []
+            elif operator == "$unwind":
+                field = spec[1:]
+                documents = [{**document, field: value} for document in documents for value in document[field]]
+            elif operator == "$group":
+                groups = {}
+                for document in documents:
+                    key = _value(document, spec["_id"][1:]) if spec["_id"] else None
+                    group = groups.setdefault(key, {"_id": key})
+                    for name, accumulator in spec.items():
+                        if name != "_id":
+                            amount = accumulator["$sum"]
+                            amount = amount if amount == 1 else _value(document, amount[1:])
+                            group[name] = group.get(name, 0) + amount
+                documents = list(groups.values())
+        return documents
+
+
+def _value(document, path):
+    for part in path.split("."):
+        document = document.get(part) if isinstance(document, dict) else None
+    return document
+
+
+def _values(document, path):
+    head, _, rest = path.partition(".")
+    value = document.get(head)
+    if isinstance(value, list) and rest:
+        return [_value(element, rest) for element in value]
+    return [_value(document, path)]
+
+
+def _matches(document, match):
+    for path, condition in match.items():
+        values = _values(document, path)
+        if not isinstance(condition, dict):
+            condition = {"$in": [condition]}
+        for operator, operand in condition.items():
+            if operator == "$in" and not any(value in operand for value in values):
+                return False
+            if operator == "$nin" and any(value in operand for value in values):
+                return False
+            if operator == "$ne" and operand in values:
+                return False
+            if operator == "$gte" and not any(value is not None and value >= operand for value in values):
+                return False
+    return True
+
+
+class FakeTabs:
+    def count_documents(self, filter):
+        return 3
+
+
+def test_order_lifecycle():
+    counters = DashboardCounters()
+    placed = order(items=[item("Starter"), item("Main Course"), item("Drinks", status="completed")])
+    counters.order_created(placed)
+    snapshot = counters.snapshot()
+    assert snapshot["open_orders"] == 1
+    assert snapshot["unpaid_bills"] == 1
+    assert snapshot["pending_dishes"] == {"Starter": 1, "Main Course": 1}
+
+    counters.item_status_changed(item("Starter"), "completed")
+    counters.item_status_changed(item("Starter", status="completed"), "completed")
+    assert counters.snapshot()["pending_dishes"] == {"Main Course": 1}
+
+    counters.order_cancelled(placed)
+    snapshot = counters.snapshot()
+    assert snapshot["open_orders"] == 0
+    assert snapshot["unpaid_bills"] == 0
+
+
+def test_items_replaced_moves_pending_counts():
+    counters = DashboardCounters()
+    old = [item("Starter"), item("Starter")]
+    counters.order_created(order(items=old))
+    counters.items_replaced(old, [item("Starter"), item("Dessert"), item("Dessert", status="cancelled")])
+    assert counters.snapshot()["pending_dishes"] == {"Starter": 1, "Dessert": 1}
+
+
+def test_payment_changes_revenue_and_unpaid_bills():
+    counters = DashboardCounters()
+    placed = order(bill=250.0)
+    counters.order_created(placed)
+    counters.payment_status_changed(placed, "paid")
+    snapshot = counters.snapshot()
+    assert snapshot["todays_revenue"] == 250.0
+    assert snapshot["unpaid_bills"] == 0
+
+    counters.payment_status_changed({**placed, "payment_status": "paid"}, "refunded")
+    snapshot = counters.snapshot()
+    assert snapshot["todays_revenue"] == 0.0
+    assert snapshot["unpaid_bills"] == 1
+
+
+def test_revenue_rolls_over_at_midnight():
+    counters = DashboardCounters()
+    counters.order_created(order(payment="paid", bill=80.0))
+    counters._revenue_day -= timedelta(days=1)
+    assert counters.snapshot()["todays_revenue"] == 0.0
+
+
+def test_tables_occupied():
+    counters = DashboardCounters()
+    counters.table_changed(None, 4)
+    counters.table_changed(4, 5)
+    counters.table_changed(None, 6)
+    counters.table_changed(6, None)
+    assert counters.snapshot()["tables_occupied"] == 1
+
+
+def test_seed_counts_revenue_by_payment_day():
+    orders = FakeOrders({
+        "open": [{"n": 4}],
+        "unpaid": [{"n": 2}],
+        "pending": [{"_id": "Starter", "n": 3}, {"_id": None, "n": 1}],
+        "revenue": [{"_id": None, "total": 420.5}],
+    })
+    counters = DashboardCounters()
+    counters.seed(orders, FakeTabs())
+
+    revenue_match = orders.pipeline[0]["$facet"]["revenue"][0]["$match"]
+    assert "paid_at" in revenue_match and "order_date_time" not in revenue_match
+    assert revenue_match["paid_at"]["$gte"] == datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    snapshot = counters.snapshot()
+    del snapshot["as_of"]
+    assert snapshot == {
+        "open_orders": 4,
+        "unpaid_bills": 2,
+        "pending_dishes": {"Starter": 3, "unknown": 1},
+        "todays_revenue": 420.5,
+        "tables_occupied": 3,
+    }
+
+
+def test_seed_after_restart_matches_live_counters():
+    now = datetime.utcnow()
+    cancelled = {**order(items=[item("Starter"), item("Main Course")]), "paid_at": None}
+    paid = {**order(bill=60.0, items=[item("Dessert")]), "paid_at": None}
+    open_order = {**order(items=[item("Starter"), item("Drinks", status="completed")]), "paid_at": None}
+
+    live = DashboardCounters()
+    for placed in (cancelled, paid, open_order):
+        live.order_created(placed)
+    live.order_cancelled(cancelled)
+    live.payment_status_changed(paid, "paid")
+    live.table_changed(None, 1)
+    live.table_changed(None, 2)
+    live.table_changed(None, 3)
+
+    # What Mongo holds afterwards: cancelling leaves the items 'ordered'
+    stored = [
+        {**cancelled, "order_status": "cancelled"},
+        {**paid, "payment_status": "paid", "paid_at": now},
+        open_order,
+        # Paid yesterday, ordered today: not today's revenue
+        {**order(status="completed", payment="paid", bill=500.0), "order_date_time": now, "paid_at": now - timedelta(days=1)},
+    ]
+    seeded = DashboardCounters()
+    seeded.seed(MemoryOrders(stored), FakeTabs())
+
+    live_snapshot, seeded_snapshot = live.snapshot(), seeded.snapshot()
+    del live_snapshot["as_of"], seeded_snapshot["as_of"]
+    assert seeded_snapshot == live_snapshot
+    assert seeded_snapshot["pending_dishes"] == {"Starter": 1, "Dessert": 1}
+
+
+def test_seed_with_empty_collections():
+    counters = DashboardCounters()
+    counters.seed(FakeOrders({"open": [], "unpaid": [], "pending": [], "revenue": []}), FakeTabs())
+    snapshot = counters.snapshot()
+    assert (snapshot["open_orders"], snapshot["todays_revenue"], snapshot["pending_dishes"]) == (0, 0.0, {})
+
+
+def test_dashboard_is_per_tenant():
+    assert dashboard_module.dashboard.for_tenant("a") is not dashboard_module.dashboard.for_tenant("b")
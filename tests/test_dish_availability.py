@@ -0,0 +1,56 @@
+import asyncio
+
+from dish_availability import DishAvailability, MENU_KEY, dish_changed, dish_availability, menu_waiters
+from tenancy import tenant_context
+
+
+class FakeDishes:
+    def __init__(self, dishes):
+        self.dishes = dishes
+
+    def find(self, filter, projection):
+        return iter(self.dishes)
+
+
+def test_load_and_unavailable():
+    index = DishAvailability()
+    index.load(FakeDishes([{"id": "soup", "available": True}, {"id": "cake", "available": False}, {"id": "tea"}]))
+    assert index.version == 1
+    assert index.unavailable(["soup", "cake", "tea", "not-on-menu"]) == ["cake", "tea"]
+
+
+def test_set_and_remove_bump_version_only_on_change():
+    index = DishAvailability()
+    assert index.set("soup", True)
+    assert not index.set("soup", True)
+    assert index.set("soup", False)
+    assert index.version == 2
+    assert index.unavailable(["soup"]) == ["soup"]
+
+    assert index.remove("soup")
+    assert not index.remove("soup")
+    assert index.snapshot() == {"version": 3, "available": {}}
+
+
+def test_change_wakes_menu_waiters():
+    async def scenario():
+        with tenant_context("availability-test"):
+            waiter = menu_waiters.register(MENU_KEY)
+            asyncio.get_running_loop().call_later(0.01, dish_changed, "soup", False)
+            woke = await menu_waiters.wait(MENU_KEY, waiter, 1)
+            return woke, dish_availability.snapshot()
+
+    woke, snapshot = asyncio.run(scenario())
+    assert woke
+    assert snapshot == {"version": 1, "available": {"soup": False}}
+
+
+def test_unchanged_dish_does_not_wake_waiters():
+    async def scenario():
+        with tenant_context("availability-idle"):
+            dish_changed("soup", True)
+            waiter = menu_waiters.register(MENU_KEY)
+            asyncio.get_running_loop().call_later(0.01, dish_changed, "soup", True)
+            return await menu_waiters.wait(MENU_KEY, waiter, 0.1)
+
+    assert asyncio.run(scenario()) is False
@@ -0,0 +1,49 @@
+import csv
+import io
+import logging
+from datetime import datetime
+
+import pytest
+
+from order_export import COLUMNS, csv_chunks, parquet_chunks
+
+
+def row(**values):
+    return {**{column: None for column in COLUMNS}, "order_id": "o1", "item_id": "soup", **values}
+
+
+def read_parquet(chunks):
+    pq = pytest.importorskip("pyarrow.parquet")
+    return pq.read_table(io.BytesIO(b"".join(chunks))).to_pylist()
+
+
+def test_csv_chunks_split_rows():
+    chunks = list(csv_chunks([row(quantity=n) for n in range(5)], chunk_rows=2))
+    assert len(chunks) == 3
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+    assert [r["quantity"] for r in rows] == ["0", "1", "2", "3", "4"]
+
+
+def test_parquet_converts_values_to_column_types():
+    pytest.importorskip("pyarrow")
+    rows = read_parquet(parquet_chunks([
+        row(quantity="2", cost="4.5", takeaway="true", date="2024-01-01T10:00:00", table=4),
+    ]))
+    assert rows[0]["quantity"] == 2
+    assert rows[0]["cost"] == 4.5
+    assert rows[0]["takeaway"] is True
+    assert rows[0]["date"] == datetime(2024, 1, 1, 10, 0)
+    assert rows[0]["table"] == "4"
+
+
+def test_parquet_writes_null_for_values_that_do_not_fit(caplog):
+    pytest.importorskip("pyarrow")
+    bad = [row(quantity="two"), row(cost={"a": 1}), row(takeaway="maybe"), row(quantity=2 ** 70), row(date="soon")]
+    with caplog.at_level(logging.WARNING, logger="order_export"):
+        # One row per row group: before the fix a bad value aborted the stream mid-file
+        rows = read_parquet(parquet_chunks(bad + [row(quantity=3)], row_group_size=1))
+    assert len(rows) == 6
+    assert [r["quantity"] for r in rows] == [None, None, None, None, None, 3]
+    assert rows[1]["cost"] is None and rows[2]["takeaway"] is None and rows[4]["date"] is None
+    assert len(caplog.records) == 5
+    assert "order o1 item soup" in caplog.records[0].getMessage()
@@ -0,0 +1,51 @@
+import pytest
+from jose import jwt
+
+import tenancy
+from router import ALGORITHM, SECRET_KEY
+from tenancy import DEFAULT_TENANT, TenantLocal, resolve_tenant, tenant_context
+
+
+@pytest.fixture(autouse=True)
+def outlets(monkeypatch):
+    monkeypatch.setattr(tenancy, "TENANTS", {DEFAULT_TENANT, "jubilee", "mgroad"})
+    monkeypatch.setattr(tenancy, "TENANT_HOSTS", {"orders.mg.example.com": "mgroad"})
+
+
+def bearer(**claims):
+    return "Bearer " + jwt.encode({"sub": "asha", **claims}, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def test_unauthenticated_requests_use_the_host():
+    assert resolve_tenant({"host": "jubilee.example.com"}) == "jubilee"
+    assert resolve_tenant({"host": "Orders.MG.example.com:443"}) == "mgroad"
+    assert resolve_tenant({"host": "www.example.com"}) == DEFAULT_TENANT
+    assert resolve_tenant({}) == DEFAULT_TENANT
+
+
+def test_token_claim_wins_over_host():
+    headers = {"authorization": bearer(tenant="mgroad"), "host": "jubilee.example.com"}
+    assert resolve_tenant(headers) == "mgroad"
+
+
+def test_token_without_claim_is_the_default_tenant_whatever_the_host():
+    headers = {"authorization": bearer(), "host": "jubilee.example.com"}
+    assert resolve_tenant(headers) == DEFAULT_TENANT
+
+
+def test_invalid_token_falls_back_to_host():
+    headers = {"authorization": "Bearer not-a-token", "host": "jubilee.example.com"}
+    assert resolve_tenant(headers) == "jubilee"
+
+
+def test_unknown_tenant_is_rejected():
+    assert resolve_tenant({"authorization": bearer(tenant="elsewhere")}) is None
+
+
+def test_tenant_local_keeps_one_instance_per_tenant():
+    counters = TenantLocal(lambda tenant: {"tenant": tenant})
+    with tenant_context("jubilee"):
+        assert counters.current() == {"tenant": "jubilee"}
+        assert counters.get("tenant") == "jubilee"
+    assert counters.current() is counters.for_tenant(DEFAULT_TENANT)
+    assert set(counters.all()) == {"jubilee", DEFAULT_TENANT}
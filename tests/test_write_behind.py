@@ -0,0 +1,85 @@
+import time
+
+from pymongo.errors import PyMongoError
+
+from write_behind import WriteBehindBuffer
+
+
+class FakeCollection:
+    name = "users"
+
+    def __init__(self):
+        self.bulk_writes = []
+        self.updates = []
+        self.fail = False
+
+    def bulk_write(self, operations, ordered=True):
+        if self.fail:
+            raise PyMongoError("primary stepped down")
+        self.bulk_writes.append([(op._filter, op._doc) for op in operations])
+
+    def update_one(self, filter, update):
+        self.updates.append((filter, update))
+
+
+def buffer(collection):
+    # Long interval, the tests flush by hand
+    return WriteBehindBuffer(collection, interval=3600)
+
+
+def test_updates_to_one_document_are_merged():
+    collection = FakeCollection()
+    bookkeeping = buffer(collection)
+    bookkeeping.set("u1", {"date_last_login": 1, "token_expiry": 10})
+    bookkeeping.set("u1", {"date_last_login": 2})
+    bookkeeping.set("u2", {"date_last_login": 3})
+    assert bookkeeping.pending() == 2
+
+    assert bookkeeping.flush() == 2
+    assert collection.bulk_writes == [[
+        ({"_id": "u1"}, {"$set": {"date_last_login": 2, "token_expiry": 10}}),
+        ({"_id": "u2"}, {"$set": {"date_last_login": 3}}),
+    ]]
+    assert bookkeeping.stats["updates_coalesced"] == 1
+    assert bookkeeping.stats["documents_written"] == 2
+    assert bookkeeping.flush() == 0
+    bookkeeping.close()
+
+
+def test_failed_flush_is_requeued_under_newer_values():
+    collection = FakeCollection()
+    bookkeeping = buffer(collection)
+    bookkeeping.set("u1", {"date_last_login": 1, "token_expiry": 10})
+    collection.fail = True
+    assert bookkeeping.flush() == 0
+    assert bookkeeping.stats["errors"] == 1
+    assert bookkeeping.pending() == 1
+
+    bookkeeping.set("u1", {"date_last_login": 2})
+    collection.fail = False
+    assert bookkeeping.flush() == 1
+    assert collection.bulk_writes == [[({"_id": "u1"}, {"$set": {"date_last_login": 2, "token_expiry": 10}})]]
+    bookkeeping.close()
+
+
+def test_close_flushes_and_later_updates_write_through():
+    collection = FakeCollection()
+    bookkeeping = buffer(collection)
+    bookkeeping.set("u1", {"date_last_login": 1})
+    bookkeeping.close()
+    assert collection.bulk_writes == [[({"_id": "u1"}, {"$set": {"date_last_login": 1}})]]
+
+    bookkeeping.set("u2", {"date_last_login": 2})
+    assert bookkeeping.pending() == 0
+    assert collection.updates == [({"_id": "u2"}, {"$set": {"date_last_login": 2}})]
+
+
+def test_background_thread_flushes_on_interval():
+    collection = FakeCollection()
+    bookkeeping = WriteBehindBuffer(collection, interval=0.01)
+    bookkeeping.set("u1", {"date_last_login": 1})
+    deadline = time.monotonic() + 2
+    while not collection.bulk_writes and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert collection.bulk_writes == [[({"_id": "u1"}, {"$set": {"date_last_login": 1}})]]
+    bookkeeping.close()
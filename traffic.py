@@ -0,0 +1,137 @@
+# traffic.py
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from urllib.parse import parse_qsl
+
+logger = logging.getLogger(__name__)
+
+# Capture Configuration, capture is off unless a path is given
+TRACE_CAPTURE_PATH = os.getenv("TRACE_CAPTURE_PATH")
+TRACE_MAX_LIST_ITEMS = 50
+
+# Keys whose values are never written to a trace
+SENSITIVE_KEYS = {"password", "hashed_password", "token", "access_token", "authorization", "phone_number"}
+
+
+def body_shape(value):
+    """
+    Reduce a JSON value to its shape: containers are kept, leaves become type names.
+    """
+    if isinstance(value, dict):
+        return {key: body_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [body_shape(item) for item in value[:TRACE_MAX_LIST_ITEMS]]
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if value is None:
+        return "null"
+    return "str"
+
+
+def sample_from_shape(shape):
+    """
+    Build a placeholder JSON value with the given shape, used when replaying.
+    """
+    if isinstance(shape, dict):
+        return {key: sample_from_shape(item) for key, item in shape.items()}
+    if isinstance(shape, list):
+        return [sample_from_shape(item) for item in shape]
+    return {"bool": False, "int": 1, "float": 1.0, "null": None}.get(shape, "replay")
+
+
+def _sanitize(params: dict) -> dict:
+    return {key: ("<redacted>" if key.lower() in SENSITIVE_KEYS else value) for key, value in params.items()}
+
+
+class TraceWriter:
+    """
+    Appends trace records to a JSONL file from a background thread,
+    so the event loop never waits on disk.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        logger.info(f"Capturing request traces to {path}")
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record: dict):
+        self._queue.put(record)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        with open(self.path, "a") as f:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    return
+                f.write(json.dumps(record, default=str) + "\n")
+                if self._queue.empty():
+                    f.flush()
+
+
+class TraceCaptureMiddleware:
+    """
+    ASGI middleware recording one sanitized line per HTTP request: route,
+    path and query params, the shape (not the content) of the JSON body,
+    the response status and the server-side duration.
+    """
+    def __init__(self, app, writer: TraceWriter):
+        self.app = app
+        self.writer = writer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        chunks = []
+        response = {"status": None}
+
+        async def capture_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                chunks.append(message.get("body", b""))
+            return message
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            await send(message)
+
+        started = time.time()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, capture_receive, capture_send)
+        finally:
+            self.writer.write(self._record(scope, b"".join(chunks), response["status"], started, start))
+
+    def _record(self, scope, body: bytes, status_code, started: float, start: float) -> dict:
+        route = scope.get("route")
+        try:
+            shape = body_shape(json.loads(body)) if body else None
+        except ValueError:
+            shape = f"<{len(body)} bytes>"
+        headers = dict(scope.get("headers") or [])
+        return {
+            "ts": started,
+            "method": scope["method"],
+            "route": getattr(route, "path", None),
+            "path": scope["path"],
+            "path_params": _sanitize(scope.get("path_params", {})),
+            "query": _sanitize(dict(parse_qsl(scope.get("query_string", b"").decode()))),
+            "content_type": headers.get(b"content-type", b"").decode() or None,
+            "body": shape,
+            "status": status_code,
+            "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
@@ -1,5 +1,9 @@
 # utilities.py    
 import os
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
 from passlib.context import CryptContext
 from jose import jwt
 from datetime import datetime, timedelta
@@ -15,9 +19,36 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 
+# Worker processes used for bulk password hashing
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def get_password_hashes(passwords: List[str]) -> List[str]:
+    """
+    Hash many passwords in parallel across a process pool, keeping input order.
+    """
+    global _hash_pool
+    if len(passwords) < 2 or HASH_WORKERS < 2:
+        return [get_password_hash(password) for password in passwords]
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            # spawn, so workers don't inherit the parent's MongoClient threads
+            _hash_pool = ProcessPoolExecutor(
+                max_workers=HASH_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+    return list(_hash_pool.map(get_password_hash, passwords))
+
+def shutdown_hash_pool():
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is not None:
+            _hash_pool.shutdown()
+            _hash_pool = None
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -0,0 +1,117 @@
+# write_behind.py
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Write-behind Configuration
+WRITE_BEHIND_INTERVAL_SECONDS = float(os.getenv("WRITE_BEHIND_INTERVAL_SECONDS", "2"))
+
+
+class WriteBehindBuffer:
+    """
+    Buffers `$set` updates that don't need to be durable immediately
+    (bookkeeping such as last-login timestamps) and writes them later.
+
+    Updates to the same document are merged, later values winning, and every
+    interval the pending documents are written with one unordered `bulk_write`.
+    Call `close()` on shutdown to flush what is left.
+    """
+    def __init__(self, collection, interval: float = WRITE_BEHIND_INTERVAL_SECONDS):
+        self.collection = collection
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._pending: Dict[Any, Tuple[dict, float]] = {}
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = None
+        self.stats = {
+            "flushes": 0,
+            "documents_written": 0,
+            "updates_coalesced": 0,
+            "last_flush_size": 0,
+            "last_flush_lag_ms": 0.0,
+            "last_flush_ms": 0.0,
+            "errors": 0,
+        }
+
+    def set(self, document_id, fields: dict):
+        """
+        Queue `{"$set": fields}` for the document with this `_id`.
+        """
+        with self._lock:
+            if not self._closed:
+                if document_id in self._pending:
+                    queued, queued_at = self._pending[document_id]
+                    self._pending[document_id] = ({**queued, **fields}, queued_at)
+                    self.stats["updates_coalesced"] += 1
+                else:
+                    self._pending[document_id] = (dict(fields), time.monotonic())
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                    self._thread.start()
+                return
+        # Shutting down, too late to buffer: write through
+        self.collection.update_one({"_id": document_id}, {"$set": fields})
+
+    def flush(self) -> int:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        start = time.monotonic()
+        oldest = min(queued_at for _, queued_at in pending.values())
+        operations = [UpdateOne({"_id": document_id}, {"$set": fields}) for document_id, (fields, _) in pending.items()]
+        try:
+            self.collection.bulk_write(operations, ordered=False)
+        except PyMongoError as e:
+            logger.error(f"Write-behind flush of {len(operations)} documents failed: {e}")
+            self.stats["errors"] += 1
+            self._requeue(pending)
+            return 0
+
+        finished = time.monotonic()
+        self.stats["flushes"] += 1
+        self.stats["documents_written"] += len(operations)
+        self.stats["last_flush_size"] = len(operations)
+        self.stats["last_flush_lag_ms"] = round((finished - oldest) * 1000, 3)
+        self.stats["last_flush_ms"] = round((finished - start) * 1000, 3)
+        logger.debug(
+            f"Write-behind flushed {len(operations)} documents to {self.collection.name}, "
+            f"lag {self.stats['last_flush_lag_ms']}ms"
+        )
+        return len(operations)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _requeue(self, pending: dict):
+        with self._lock:
+            for document_id, (fields, queued_at) in pending.items():
+                if document_id in self._pending:
+                    newer, _ = self._pending[document_id]
+                    fields = {**fields, **newer}
+                self._pending[document_id] = (fields, queued_at)
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.interval)
+            if self._closed:
+                return
+            self.flush()